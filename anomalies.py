@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+from settings import (
+    FLATLINE_MIN_RUN,
+    GAP_MAX_MINUTES,
+    SENSOR_LIMITS,
+    SENSOR_MAX_RATE,
+)
+
+FAULT_COLUMN = "Falha Sensor"
+REASON_COLUMN = "Motivo Falha"
+GAP_COLUMN = "Lacuna"
+
+
+# Cada lote é avaliado de forma vetorizada; entre lotes só é mantido o último
+# estado de cada ponto (horário, último valor e tamanho da sequência repetida
+# por variável), então o histórico nunca é reprocessado. Cada dia de campanha é
+# uma série própria, como em quality._intervals: o intervalo de semanas entre
+# duas campanhas não é lacuna nem variação brusca.
+class SensorFaultDetector:
+    def __init__(
+        self,
+        limits=None,
+        max_rate=None,
+        flatline_min_run=FLATLINE_MIN_RUN,
+        gap_max_minutes=GAP_MAX_MINUTES,
+    ):
+        self.limits = SENSOR_LIMITS if limits is None else limits
+        self.max_rate = SENSOR_MAX_RATE if max_rate is None else max_rate
+        self.flatline_min_run = flatline_min_run
+        self.gap_max_minutes = gap_max_minutes
+        self._state = {}
+
+    def reset(self):
+        self._state = {}
+
+    def process(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        result = pd.DataFrame(
+            {
+                FAULT_COLUMN: np.zeros(len(chunk), dtype=bool),
+                REASON_COLUMN: np.full(len(chunk), "", dtype=object),
+                GAP_COLUMN: np.zeros(len(chunk), dtype=bool),
+            },
+            index=chunk.index,
+        )
+        if chunk.empty:
+            return result
+
+        # ordena por ponto e horário mantendo a ordem de chegada nos empates
+        ordered = chunk.sort_values(["pontos", "DataHora"], kind="stable")
+        pontos = ordered["pontos"]
+        dia = ordered["DataHora"].dt.normalize()
+        grouped = ordered.groupby([pontos, dia], sort=False, dropna=False)
+        head = ~pontos.duplicated().to_numpy()
+        carried = {p: self._state.get(p) for p in pontos[head]}
+
+        # só a primeira leitura do ponto no lote pode continuar a série do lote
+        # anterior, e apenas se ela for do mesmo dia da última leitura guardada
+        carried_time = pd.to_datetime(
+            pontos[head].map(lambda p: carried[p]["datahora"] if carried[p] else pd.NaT)
+        )
+        first = head.copy()
+        first[head] = (carried_time.dt.normalize() == dia[head]).to_numpy()
+
+        prev_time = grouped["DataHora"].shift()
+        if first.any():
+            prev_time[first] = carried_time[first[head]].to_numpy()
+        dt_min = (ordered["DataHora"] - prev_time).dt.total_seconds() / 60.0
+
+        fault = np.zeros(len(ordered), dtype=bool)
+        reason = pd.Series("", index=ordered.index, dtype=object)
+        gap = (dt_min > self.gap_max_minutes).to_numpy()
+
+        new_state = {
+            p: {"datahora": None, "valores": {}} for p in pontos.unique()
+        }
+
+        for col, (lo, hi) in self.limits.items():
+            if col not in ordered.columns:
+                continue
+
+            values = ordered[col]
+            prev = grouped[col].shift()
+            carried_run = np.zeros(len(ordered), dtype=np.int64)
+            if first.any():
+                prev[first] = pontos[first].map(
+                    lambda p: carried[p]["valores"].get(col, (np.nan, 0))[0]
+                ).to_numpy()
+                carried_run[first] = pontos[first].map(
+                    lambda p: carried[p]["valores"].get(col, (np.nan, 0))[1]
+                ).to_numpy()
+
+            out_of_range = (values.notna() & ~values.between(lo, hi)).to_numpy()
+
+            rate_limit = self.max_rate.get(col)
+            if rate_limit is None:
+                jump = np.zeros(len(ordered), dtype=bool)
+            else:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    rate = ((values - prev).abs() / dt_min.where(dt_min > 0)).to_numpy()
+                jump = np.nan_to_num(rate, nan=0.0) > rate_limit
+
+            # comprimento da sequência de valores idênticos, continuando a do lote anterior;
+            # a primeira leitura de um dia não tem anterior, então sempre abre sequência nova
+            same = (values == prev).to_numpy()
+            run_key = pd.Series(~same, index=ordered.index).groupby(pontos).cumsum()
+            run_len = ordered.groupby([pontos, run_key]).cumcount().to_numpy() + 1
+            continues = run_key.to_numpy() == 0
+            carried_run = pd.Series(carried_run, index=ordered.index)
+            carried_run = carried_run.groupby(pontos).transform("first").to_numpy()
+            run_len = np.where(continues, run_len + carried_run, run_len)
+            run_len = np.where(values.isna().to_numpy(), 0, run_len)
+            flatline = run_len >= self.flatline_min_run
+
+            for mask, label in (
+                (out_of_range, "fora da faixa"),
+                (jump, "variação brusca"),
+                (flatline, "valor travado"),
+            ):
+                if mask.any():
+                    reason = reason + np.where(mask, f"{col}: {label}; ", "")
+            fault |= out_of_range | jump | flatline
+
+            last_rows = ~pontos.duplicated(keep="last").to_numpy()
+            for p, v, n in zip(pontos[last_rows], values[last_rows], run_len[last_rows]):
+                new_state[p]["valores"][col] = (v, int(n))
+
+        last = ordered[~pontos.duplicated(keep="last")]
+        for p, t in zip(last["pontos"], last["DataHora"]):
+            new_state[p]["datahora"] = t
+        self._state.update(new_state)
+
+        result.loc[ordered.index, FAULT_COLUMN] = fault
+        result.loc[ordered.index, REASON_COLUMN] = reason.str.rstrip("; ").to_numpy()
+        result.loc[ordered.index, GAP_COLUMN] = gap
+        return result
+
+
+def flag_anomalies(df: pd.DataFrame, detector: SensorFaultDetector | None = None) -> pd.DataFrame:
+    detector = SensorFaultDetector() if detector is None else detector
+    flags = detector.process(df)
+    df = df.copy()
+    for col in flags.columns:
+        df[col] = flags[col]
+    return df
+
+
+def valid_readings(df: pd.DataFrame) -> pd.DataFrame:
+    if FAULT_COLUMN not in df.columns:
+        return df
+    return df[~df[FAULT_COLUMN]]
@@ -0,0 +1,372 @@
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import time
+from datetime import date
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from anomalies import valid_readings
+from data_export import EXPORT_FORMATS, export_filename, iter_export, select_positions
+from data_loader import (
+    build_point_summaries,
+    build_statistics,
+    dataset_version,
+    filter_data,
+    load_data,
+)
+from settings import API_HOST, API_PORT, API_VERSION_CHECK_SECONDS
+from ui import VARIABLE_MAP
+from warmup import READY, readiness, start_warm_up
+
+READING_COLUMNS = [
+    "pontos",
+    "DataHora",
+    "Temperatura (°C)",
+    "Classificação Temp",
+    "RH (%)",
+    "Classificação RH",
+    "CO2 (ppm)",
+    "Classificação CO2",
+    "Ponto de Orvalho (°C)",
+    "Falha Sensor",
+    "Motivo Falha",
+]
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+_version_state = {"versao": None, "verificado_em": 0.0}
+_version_lock = threading.Lock()
+
+
+def current_version() -> str:
+    # evita um stat por requisição: a base só é verificada a cada poucos segundos
+    with _version_lock:
+        agora = time.monotonic()
+        if (
+            _version_state["versao"] is None
+            or agora - _version_state["verificado_em"] >= API_VERSION_CHECK_SECONDS
+        ):
+            _version_state["versao"] = dataset_version()
+            _version_state["verificado_em"] = agora
+        return _version_state["versao"]
+
+
+@lru_cache(maxsize=2)
+def _dataset(versao: str):
+    # uma referência por versão: evita a cópia que o cache do Streamlit devolve a cada chamada
+    df = load_data()
+    catalogo = {
+        "datas": sorted(df["Data"].dropna().unique()),
+        "pontos": sorted(df["pontos"].dropna().unique().tolist()),
+    }
+    return df, catalogo
+
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    if not values or values[0] == "":
+        return default
+    return values[0]
+
+
+def _resolve_filters(catalogo, params):
+    datas = catalogo["datas"]
+    if not datas:
+        raise ApiError(404, "Nenhuma data disponível na base.")
+
+    data_param = _param(params, "data")
+    if data_param is None:
+        data_sel = datas[-1]
+    else:
+        try:
+            data_sel = date.fromisoformat(data_param)
+        except ValueError:
+            raise ApiError(400, f"Data inválida: {data_param} (use AAAA-MM-DD).")
+
+    pontos_disponiveis = catalogo["pontos"]
+    pontos_param = _param(params, "pontos")
+    pontos_sel = (
+        pontos_disponiveis
+        if pontos_param is None
+        else [p.strip() for p in pontos_param.split(",") if p.strip()]
+    )
+
+    hora_sel = _param(params, "hora", "Todos")
+    excluir_falhas = _param(params, "excluir_falhas", "1") not in ("0", "false", "nao", "não")
+
+    variavel_param = _param(params, "variavel", "Temperatura (°C)")
+    if variavel_param in VARIABLE_MAP:
+        variavel, col_sel = variavel_param, VARIABLE_MAP[variavel_param]
+    elif variavel_param in VARIABLE_MAP.values():
+        col_sel = variavel_param
+        variavel = next(k for k, v in VARIABLE_MAP.items() if v == col_sel)
+    else:
+        raise ApiError(400, f"Variável desconhecida: {variavel_param}")
+
+    inicio_param = _param(params, "inicio")
+    fim_param = _param(params, "fim")
+    try:
+        data_inicio = date.fromisoformat(inicio_param) if inicio_param else data_sel
+        data_fim = date.fromisoformat(fim_param) if fim_param else max(data_sel, data_inicio)
+    except ValueError:
+        raise ApiError(400, "Período inválido (use inicio/fim no formato AAAA-MM-DD).")
+
+    return {
+        "data_sel": data_sel,
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "pontos_sel": tuple(pontos_sel),
+        "hora_sel": hora_sel,
+        "excluir_falhas": excluir_falhas,
+        "variavel": variavel,
+        "col_sel": col_sel,
+    }
+
+
+def _filtered(df, filtros):
+    df_filtrado = filter_data(
+        df=df,
+        data_sel=filtros["data_sel"],
+        pontos_sel=list(filtros["pontos_sel"]),
+        hora_sel=filtros["hora_sel"],
+    )
+    df_agregado = valid_readings(df_filtrado) if filtros["excluir_falhas"] else df_filtrado
+    return df_filtrado, df_agregado
+
+
+def _frame_json(df) -> str:
+    return df.to_json(orient="records", date_format="iso", force_ascii=False)
+
+
+def _endpoint_datas(df, filtros):
+    _, catalogo = _dataset(current_version())
+    return json.dumps(
+        {
+            "datas": [d.isoformat() for d in catalogo["datas"]],
+            "pontos": catalogo["pontos"],
+            "variaveis": VARIABLE_MAP,
+        },
+        ensure_ascii=False,
+    )
+
+
+def _endpoint_leituras(df, filtros):
+    df_filtrado, _ = _filtered(df, filtros)
+    return _frame_json(df_filtrado[READING_COLUMNS])
+
+
+def _endpoint_estatisticas(df, filtros):
+    _, df_agregado = _filtered(df, filtros)
+    estat = build_statistics(df_agregado, filtros["col_sel"])
+    return _frame_json(estat)
+
+
+def _endpoint_pontos(df, filtros):
+    _, df_agregado = _filtered(df, filtros)
+    resumo = build_point_summaries(
+        df_agregado,
+        list(filtros["pontos_sel"]),
+        filtros["col_sel"],
+        filtros["variavel"],
+    )
+    return json.dumps(resumo, ensure_ascii=False)
+
+
+ENDPOINTS = {
+    "/api/datas": _endpoint_datas,
+    "/api/leituras": _endpoint_leituras,
+    "/api/estatisticas": _endpoint_estatisticas,
+    "/api/pontos": _endpoint_pontos,
+}
+
+
+def _etag(versao: str, path: str, filtros) -> str:
+    chave = json.dumps([versao, path, filtros], default=str, sort_keys=True)
+    return '"' + hashlib.sha1(chave.encode("utf-8")).hexdigest()[:20] + '"'
+
+
+@lru_cache(maxsize=512)
+def _cached_response(versao: str, path: str, filtros_key: tuple) -> bytes:
+    df, _ = _dataset(versao)
+    return ENDPOINTS[path](df, dict(filtros_key)).encode("utf-8")
+
+
+EXPORT_ENDPOINTS = {f"/api/exportar.{formato}": formato for formato in EXPORT_FORMATS}
+
+READY_ENDPOINT = "/api/pronto"
+
+
+def _warm_responses():
+    # respostas padrão (último dia, todos os pontos) já ficam no cache de respostas
+    for path in ENDPOINTS:
+        handle(path, "")
+
+
+def handle_export(path: str, query: str, if_none_match: str | None = None):
+    formato = EXPORT_ENDPOINTS[path]
+    versao = current_version()
+    df, catalogo = _dataset(versao)
+    filtros = _resolve_filters(catalogo, parse_qs(query))
+    etag = _etag(versao, path, filtros)
+
+    if if_none_match is not None and etag in [t.strip() for t in if_none_match.split(",")]:
+        return 304, etag, None, None
+
+    positions = select_positions(
+        df,
+        filtros["data_inicio"],
+        filtros["data_fim"],
+        list(filtros["pontos_sel"]),
+        filtros["hora_sel"],
+    )
+    nome = export_filename(filtros["data_inicio"], filtros["data_fim"], formato)
+    return 200, etag, nome, iter_export(df, positions, formato)
+
+
+def handle(path: str, query: str, if_none_match: str | None = None):
+    if path not in ENDPOINTS:
+        raise ApiError(404, f"Endpoint não encontrado: {path}")
+
+    versao = current_version()
+    _, catalogo = _dataset(versao)
+    filtros = _resolve_filters(catalogo, parse_qs(query))
+    etag = _etag(versao, path, filtros)
+
+    if if_none_match is not None and etag in [t.strip() for t in if_none_match.split(",")]:
+        return 304, etag, b""
+
+    body = _cached_response(versao, path, tuple(sorted(filtros.items())))
+    return 200, etag, body
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # cabeçalho e corpo saem em escritas separadas; sem isso o Nagle atrasa cada resposta
+    disable_nagle_algorithm = True
+    server_version = "QualidadeArAPI/1.0"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/") or "/"
+        if path in EXPORT_ENDPOINTS:
+            self._send_export(path, url.query)
+            return
+        if path == READY_ENDPOINT:
+            self._send_ready()
+            return
+
+        try:
+            status, etag, body = handle(
+                path,
+                url.query,
+                self.headers.get("If-None-Match"),
+            )
+        except ApiError as e:
+            status, etag = e.status, None
+            body = json.dumps({"erro": str(e)}, ensure_ascii=False).encode("utf-8")
+        except Exception as e:
+            status, etag = 500, None
+            body = json.dumps({"erro": f"Erro interno: {e}"}, ensure_ascii=False).encode("utf-8")
+
+        self.send_response(status)
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        if status != 304:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_export(self, path, query):
+        try:
+            status, etag, nome, chunks = handle_export(
+                path, query, self.headers.get("If-None-Match")
+            )
+        except ApiError as e:
+            self._send_error_json(e.status, str(e))
+            return
+        except Exception as e:
+            self._send_error_json(500, f"Erro interno: {e}")
+            return
+
+        self.send_response(status)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        if status == 304:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        formato = EXPORT_ENDPOINTS[path]
+        self.send_header("Content-Type", EXPORT_FORMATS[formato]["mime"])
+        self.send_header("Content-Disposition", f'attachment; filename="{nome}"')
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        # resposta em partes: nenhum arquivo completo é montado em memória
+        for chunk in chunks:
+            self.wfile.write(f"{len(chunk):X}\r\n".encode("ascii") + chunk + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _send_ready(self):
+        # 503 até o aquecimento terminar, para o balanceador só enviar tráfego depois
+        estado = readiness()
+        status = 200 if estado["status"] == READY else 503
+        body = json.dumps(estado, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_json(self, status, message):
+        body = json.dumps({"erro": message}, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def create_server(host: str = API_HOST, port: int = API_PORT) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), ApiHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API JSON local da análise de qualidade do ar.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    server = create_server(args.host, args.port)
+    start_warm_up(extra_stages=[("respostas da API", _warm_responses)])
+    print(f"API disponível em http://{args.host}:{args.port}/api/datas")
+    print(f"Prontidão em http://{args.host}:{args.port}{READY_ENDPOINT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
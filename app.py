@@ -1,15 +1,41 @@
+import json
 from datetime import datetime
 
+import pandas as pd
 import streamlit as st
 
-from charts import build_reference_table, chart_co2, chart_means, chart_statistics
-from data_loader import build_statistics, filter_data, load_data
-from map_export import export_static_map
+from anomalies import valid_readings
+from charts import (
+    build_reference_table,
+    chart_co2,
+    chart_cube_heatmap,
+    chart_cube_trend,
+    chart_external_delta,
+    chart_means,
+    chart_statistics,
+)
+from cube import CUBE_STATISTICS, build_cube, cube_matrix, day_over_day
+from data_export import EXPORT_FORMATS, export_filename, export_url, iter_export, select_positions
+from data_loader import build_statistics, dataset_version, filter_data, load_data
+from interpolation import build_surface
+from jobs import get_report_queue, job_key
+from live_map import live_payload, render_live_map
 from map_view import render_map
-from report import export_plotly_figures, generate_pdf
+from quality import data_quality
+from reference_series import DELTA_COLUMNS, reference_for
+from report import build_report
 from rules import cor_classificacao
-from settings import APP_TITLE, PAGE_TITLE
-from ui import render_sidebar
+from settings import (
+    APP_TITLE,
+    EXPORT_API_URL,
+    EXPORT_DASHBOARD_MAX_ROWS,
+    LIVE_MAP_REFRESH_SECONDS,
+    PAGE_TITLE,
+    PDF_DEFAULT_PROFILE,
+    PDF_PROFILES,
+)
+from ui import MODE_COMPARE, VARIABLE_MAP, render_sidebar
+from warmup import READY, readiness, start_warm_up
 
 
 st.set_page_config(layout="wide", page_title=PAGE_TITLE)
@@ -17,6 +43,12 @@ st.markdown(f"<h2>{APP_TITLE}</h2>", unsafe_allow_html=True)
 
 
 def main():
+    # com serve.py o aquecimento já começou junto com o servidor e esta chamada não faz
+    # nada; com `streamlit run app.py` ele só começa aqui, na primeira sessão
+    start_warm_up()
+    if readiness()["status"] != READY:
+        st.sidebar.caption("Preparando dados e gráficos em segundo plano; a primeira consulta pode demorar.")
+
     try:
         df = load_data()
     except Exception as e:
@@ -24,6 +56,11 @@ def main():
         st.stop()
 
     controls = render_sidebar(df)
+    qualidade = render_data_health(df)
+
+    if controls["modo"] == MODE_COMPARE:
+        render_comparison(df, controls)
+        return
 
     df_filtrado = filter_data(
         df=df,
@@ -48,6 +85,8 @@ def main():
             "CO2 (ppm)",
             "Classificação CO2",
             "Ponto de Orvalho (°C)",
+            "Falha Sensor",
+            "Motivo Falha",
         ]
     ].copy()
 
@@ -57,7 +96,42 @@ def main():
     )
     st.dataframe(styled_df, use_container_width=True)
 
-    estat = build_statistics(df_filtrado, controls["col_sel"])
+    total_falhas = int(df_filtrado["Falha Sensor"].sum())
+    if total_falhas:
+        st.info(
+            f"{total_falhas} leitura(s) marcada(s) com possível falha de sensor"
+            + (" foram desconsideradas nas médias." if controls["excluir_falhas"] else ".")
+        )
+
+    df_agregado = valid_readings(df_filtrado) if controls["excluir_falhas"] else df_filtrado
+
+    referencia = None
+    if controls["ref_serie"] is not None:
+        try:
+            referencia = reference_for(df, dataset_version(), controls["ref_serie"]).loc[df_agregado.index]
+        except Exception as e:
+            st.error(f"Erro ao carregar a série externa: {e}")
+        else:
+            # as linhas externas dos gráficos passam a usar a média da série no período filtrado
+            medias = referencia[["Temperatura Externa (°C)", "RH Externa (%)"]].mean()
+            controls = {
+                **controls,
+                "ext_temp": controls["ext_temp"] if pd.isna(medias.iloc[0]) else float(medias.iloc[0]),
+                "ext_ur": controls["ext_ur"] if pd.isna(medias.iloc[1]) else float(medias.iloc[1]),
+            }
+
+    estat = build_statistics(
+        df_agregado,
+        controls["col_sel"],
+        chave=(
+            dataset_version(),
+            controls["data_sel"],
+            tuple(controls["pontos_sel"]),
+            controls["hora_sel"],
+            controls["excluir_falhas"],
+        ),
+        colunas=tuple(VARIABLE_MAP.values()),
+    )
 
     tabela_ref = build_reference_table(
         controls["ext_temp"],
@@ -76,14 +150,14 @@ def main():
     st.plotly_chart(fig_stats, use_container_width=True)
 
     fig_co2 = chart_co2(
-        df_filtrado=df_filtrado,
+        df_filtrado=df_agregado,
         ref_tipo=controls["ref_tipo"],
         ext_co2=controls["ext_co2"],
     )
     st.plotly_chart(fig_co2, use_container_width=True)
 
     fig_temp, fig_umid, fig_co2_ref = chart_means(
-        df_filtrado=df_filtrado,
+        df_filtrado=df_agregado,
         ref_tipo=controls["ref_tipo"],
         ext_temp=controls["ext_temp"],
         ext_ur=controls["ext_ur"],
@@ -93,58 +167,291 @@ def main():
     st.plotly_chart(fig_umid, use_container_width=True)
     st.plotly_chart(fig_co2_ref, use_container_width=True)
 
+    if referencia is not None:
+        render_external_deltas(df_agregado, referencia, controls["ref_serie"])
+
+    superficie = None
+    if controls["mostrar_superficie"]:
+        superficie = build_surface(
+            df_filtrado=df_agregado,
+            col_sel=controls["col_sel"],
+            pontos_sel=controls["pontos_sel"],
+            data_sel=controls["data_sel"],
+            hora_sel=controls["hora_sel"],
+        )
+
     st.markdown("### Mapa dos pontos de coleta")
+    if controls["mapa_ao_vivo"]:
+        st.fragment(run_every=LIVE_MAP_REFRESH_SECONDS)(render_live_section)(controls)
+    else:
+        render_map_section(df_agregado, controls, superficie)
+
+    st.markdown("---")
+    render_data_export(df, controls)
+
+    st.markdown("---")
+    st.subheader("📄 Exportar relatório (PDF)")
+
+    perfil = st.selectbox(
+        "Perfil de saída do PDF",
+        list(PDF_PROFILES),
+        index=list(PDF_PROFILES).index(PDF_DEFAULT_PROFILE),
+        format_func=lambda p: f"{p} – {PDF_PROFILES[p]['descricao']}",
+    )
+
+    if st.button("Gerar PDF com Tabela, Gráficos e Mapa"):
+        chave = job_key(dataset_version(), controls, perfil)
+        job = get_report_queue().submit(
+            chave,
+            build_report,
+            fig_temp=fig_temp,
+            fig_umid=fig_umid,
+            fig_co2=fig_co2_ref,
+            df_filtrado=df_agregado,
+            tabela_ref_df=tabela_ref,
+            qualidade=qualidade,
+            data_sel=controls["data_sel"],
+            pontos_sel=controls["pontos_sel"],
+            col_sel=controls["col_sel"],
+            variavel=controls["variavel"],
+            ref_tipo=controls["ref_tipo"],
+            ext_temp=controls["ext_temp"],
+            ext_ur=controls["ext_ur"],
+            ext_co2=controls["ext_co2"],
+            superficie=superficie,
+            profile=perfil,
+        )
+        st.session_state["report_job_id"] = job.id
+
+    job = get_report_queue().get(st.session_state.get("report_job_id"))
+    if job is not None:
+        # só reexecuta periodicamente enquanto o relatório estiver em andamento
+        st.fragment(run_every=1.0 if job.in_flight else None)(render_report_status)(job.id)
+
+
+def render_map_section(df_agregado, controls, superficie):
     render_map(
-        df_filtrado=df_filtrado,
+        df_filtrado=df_agregado,
         col_sel=controls["col_sel"],
         variavel=controls["variavel"],
         pontos_sel=controls["pontos_sel"],
+        superficie=superficie,
     )
+    if superficie is not None:
+        st.caption(
+            f"Superfície interpolada (IDW) de {controls['variavel']}: "
+            f"verde = {superficie['vmin']:.2f}, vermelho = {superficie['vmax']:.2f}"
+        )
+    elif controls["mostrar_superficie"]:
+        st.caption("A superfície interpolada exige pelo menos dois pontos com dados.")
 
-    st.markdown("---")
-    st.subheader("📄 Exportar relatório (PDF)")
 
-    if st.button("Gerar PDF com Tabela, Gráficos e Mapa"):
-        temp_dir_graficos = None
-        temp_dir_mapa = None
+def render_live_section(controls):
+    # reexecutado sozinho a cada intervalo: relê a base (pega versões novas) e envia só o JSON dos pontos
+    df = load_data()
+    df_filtrado = filter_data(df, controls["data_sel"], controls["pontos_sel"], controls["hora_sel"])
+    df_agregado = valid_readings(df_filtrado) if controls["excluir_falhas"] else df_filtrado
 
-        try:
-            temp_dir_graficos, png_paths = export_plotly_figures(
-                fig_temp=fig_temp,
-                fig_umid=fig_umid,
-                fig_co2=fig_co2_ref,
-            )
+    payload = live_payload(
+        df_agregado,
+        controls["col_sel"],
+        controls["variavel"],
+        controls["pontos_sel"],
+        dataset_version(),
+    )
+    if not payload["features"]:
+        st.warning("Nenhum ponto disponível para exibir no mapa.")
+        return
 
-            temp_dir_mapa, mapa_path = export_static_map(
-                df_filtrado=df_filtrado,
-                pontos_sel=controls["pontos_sel"],
-                col_sel=controls["col_sel"],
-                variavel=controls["variavel"],
-            )
+    render_live_map(payload)
+    tamanho = len(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    st.caption(
+        f"Mapa ao vivo: {tamanho / 1024:.1f} KB por atualização, a cada {LIVE_MAP_REFRESH_SECONDS:.0f} s. "
+        "A superfície interpolada aparece apenas no mapa padrão."
+    )
+
+
+def render_data_health(df):
+    qualidade = data_quality(df, dataset_version())
+    resumo = qualidade["resumo"]
+    ocorrencias = resumo["horarios_invalidos"] + resumo["valores_invalidos"] + resumo["lacunas"] + resumo["duplicados"]
+
+    titulo = f"Saúde dos dados: {resumo['leituras']} leituras em {resumo['arquivos']} arquivo(s)"
+    if ocorrencias:
+        titulo += f" ⚠️ {ocorrencias} ocorrência(s)"
+
+    with st.expander(titulo, expanded=False):
+        colunas = st.columns(5)
+        colunas[0].metric("Horários ilegíveis", resumo["horarios_invalidos"])
+        colunas[1].metric("Valores ilegíveis", resumo["valores_invalidos"])
+        colunas[2].metric("Valores ausentes", resumo["valores_ausentes"])
+        colunas[3].metric("Lacunas", resumo["lacunas"])
+        colunas[4].metric("Horários duplicados", resumo["duplicados"])
 
-            pdf_buffer = generate_pdf(
-                tabela_ref_df=tabela_ref,
-                png_paths=png_paths,
-                data_sel=controls["data_sel"],
-                pontos_sel=controls["pontos_sel"],
-                mapa_path=mapa_path,
+        st.markdown("**Cobertura por dia e ponto**")
+        st.dataframe(
+            qualidade["cobertura"].style.format({"Cobertura": "{:.0%}"}),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+        st.markdown("**Lacunas de amostragem e duplicidades por ponto**")
+        st.dataframe(qualidade["lacunas"].round(1), use_container_width=True, hide_index=True)
+
+        valores = qualidade["valores"]
+        problemas = valores[(valores["Ausentes"] > 0) | (valores["Inválidos"] > 0)]
+        st.markdown("**Valores ausentes ou ilegíveis por coluna e ponto**")
+        if problemas.empty:
+            st.caption("Nenhum valor ausente ou ilegível.")
+        else:
+            st.dataframe(problemas, use_container_width=True, hide_index=True)
+
+    return qualidade
+
+
+def render_external_deltas(df_agregado, referencia, ref_serie):
+    st.markdown("### Diferença interno × externo (série INMET)")
+
+    cobertura = referencia["Temperatura Externa (°C)"].notna().mean() if len(referencia) else 0.0
+    st.caption(
+        f"{ref_serie.name}: {cobertura:.0%} das leituras com hora da estação correspondente."
+    )
+    if not cobertura:
+        st.warning("A série externa não cobre o período filtrado.")
+        return
+
+    unidades = {"Temperatura (°C)": "°C", "RH (%)": "%", "Ponto de Orvalho (°C)": "°C"}
+    for coluna, (externa, delta) in DELTA_COLUMNS.items():
+        if referencia[externa].notna().any():
+            st.plotly_chart(
+                chart_external_delta(df_agregado, referencia, delta, unidades[coluna]),
+                use_container_width=True,
             )
 
-            st.download_button(
-                label="⬇️ Baixar relatório (PDF)",
-                data=pdf_buffer,
-                file_name=f"relatorio_qualidade_ar_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
-                mime="application/pdf",
+
+def render_comparison(df, controls):
+    st.markdown("### Comparação entre dias")
+
+    cube = build_cube(
+        df,
+        dataset_version(),
+        tuple(VARIABLE_MAP.values()),
+        controls["excluir_falhas"],
+    )
+
+    estatistica = st.selectbox(
+        "Estatística",
+        list(CUBE_STATISTICS),
+        format_func=CUBE_STATISTICS.get,
+    )
+    matriz = cube_matrix(cube, controls["col_sel"], estatistica, controls["pontos_sel"])
+
+    if matriz.empty:
+        st.warning("Nenhum dado encontrado para os pontos selecionados.")
+        return
+
+    rotulo = f"{CUBE_STATISTICS[estatistica]} de {controls['variavel']}"
+    st.plotly_chart(
+        chart_cube_heatmap(matriz, f"{rotulo} por dia e ponto", controls["variavel"]),
+        use_container_width=True,
+    )
+    st.plotly_chart(
+        chart_cube_trend(matriz, f"Evolução: {rotulo}", controls["variavel"]),
+        use_container_width=True,
+    )
+    if len(matriz) > 1:
+        st.plotly_chart(
+            chart_cube_heatmap(
+                day_over_day(matriz),
+                f"Variação em relação ao dia anterior: {rotulo}",
+                controls["variavel"],
+                diverging=True,
+            ),
+            use_container_width=True,
+        )
+
+    st.dataframe(matriz.round(2), use_container_width=True)
+
+
+def render_data_export(df, controls):
+    st.subheader("📥 Exportar leituras (CSV/Parquet)")
+
+    datas = sorted(df["Data"].dropna().unique())
+    col_periodo, col_formato = st.columns(2)
+    with col_periodo:
+        periodo = st.date_input(
+            "Período",
+            value=(controls["data_sel"], controls["data_sel"]),
+            min_value=datas[0],
+            max_value=datas[-1],
+        )
+    with col_formato:
+        formato = st.selectbox("Formato", list(EXPORT_FORMATS), format_func=str.upper)
+
+    if not isinstance(periodo, (tuple, list)) or len(periodo) != 2:
+        st.caption("Selecione a data inicial e a final do período.")
+        return
+    data_inicio, data_fim = periodo
+
+    hora_sel = controls["hora_sel"] if data_inicio == data_fim == controls["data_sel"] else "Todos"
+    url = export_url(EXPORT_API_URL, formato, data_inicio, data_fim, controls["pontos_sel"], hora_sel)
+    st.link_button(f"Baixar pela API ({formato.upper()}, enviado em partes)", url)
+    st.caption(
+        "A API (`python api.py`) envia o arquivo em blocos, sem montá-lo em memória. "
+        f"O botão abaixo monta o arquivo inteiro no servidor do painel e aceita até {EXPORT_DASHBOARD_MAX_ROWS:,} linhas."
+    )
+
+    if st.button("Preparar arquivo de leituras"):
+        positions = select_positions(df, data_inicio, data_fim, controls["pontos_sel"], hora_sel)
+        if len(positions) > EXPORT_DASHBOARD_MAX_ROWS:
+            st.warning(
+                f"O período tem {len(positions):,} linhas, acima do limite de {EXPORT_DASHBOARD_MAX_ROWS:,} "
+                "do download pelo painel. Use o link da API acima."
             )
+            return
 
-        except Exception as e:
-            st.error(f"Não foi possível gerar o PDF: {e}")
+        # o st.download_button precisa do arquivo completo em memória
+        st.download_button(
+            label=f"⬇️ Baixar leituras ({formato.upper()}, {len(positions)} linhas)",
+            data=b"".join(iter_export(df, positions, formato)),
+            file_name=export_filename(data_inicio, data_fim, formato),
+            mime=EXPORT_FORMATS[formato]["mime"],
+        )
+
+
+def render_report_status(job_id):
+    job = get_report_queue().get(job_id)
+    if job is None:
+        return
+
+    if job.in_flight:
+        st.session_state["report_job_polling"] = job.id
+        st.progress(job.progress, text=f"Gerando relatório: {job.stage}...")
+        return
 
-        finally:
-            if temp_dir_graficos is not None:
-                temp_dir_graficos.cleanup()
-            if temp_dir_mapa is not None:
-                temp_dir_mapa.cleanup()
+    if st.session_state.get("report_job_polling") == job.id:
+        # o job terminou durante o acompanhamento: recarrega a página sem o temporizador
+        st.session_state["report_job_polling"] = None
+        st.rerun()
+
+    if job.error is not None:
+        st.error(f"Não foi possível gerar o PDF: {job.error}")
+        return
+
+    if job.stats:
+        etapas = ", ".join(f"{nome}: {seg:.2f} s" for nome, seg in job.timings.items())
+        st.caption(
+            f"Perfil {job.stats['perfil']}: PDF de {job.stats['pdf_bytes'] / 1024:.0f} KB "
+            f"(mapa {job.stats['mapa_bytes'] / 1024:.0f} KB) gerado em {job.stats['segundos']:.2f} s"
+            + (f" — {etapas}" if etapas else "")
+        )
+
+    st.download_button(
+        label="⬇️ Baixar relatório (PDF)",
+        data=job.result,
+        file_name=f"relatorio_qualidade_ar_{datetime.fromtimestamp(job.finished_at).strftime('%Y%m%d_%H%M')}.pdf",
+        mime="application/pdf",
+    )
 
 
 if __name__ == "__main__":
@@ -85,26 +85,124 @@ def chart_co2(df_filtrado, ref_tipo, ext_co2):
     return fig
 
 
-def chart_means(df_filtrado, ref_tipo, ext_temp, ext_ur, ext_co2):
-    df_mean = (
-        df_filtrado.groupby("pontos")[["Temperatura (°C)", "RH (%)", "CO2 (ppm)"]]
+MEAN_CHART_SPECS = [
+    {
+        "key": "temp",
+        "coluna": "Temperatura (°C)",
+        "titulo": "Temperatura Média vs Referências",
+        "unidade": "°C",
+        "nome": "Temperatura Média",
+        "cor": "tomato",
+        "nome_int": "Interno 23°C",
+        "nome_ext": "Externo {:.1f}°C",
+    },
+    {
+        "key": "umid",
+        "coluna": "RH (%)",
+        "titulo": "Umidade Relativa Média vs Referências",
+        "unidade": "%",
+        "nome": "Umidade Média",
+        "cor": "skyblue",
+        "nome_int": "Interno 52,5%",
+        "nome_ext": "Externo {:.1f}%",
+    },
+    {
+        "key": "co2",
+        "coluna": "CO2 (ppm)",
+        "titulo": "CO₂ Médio vs Referências",
+        "unidade": "ppm",
+        "nome": "CO₂ Médio",
+        "cor": "lightgreen",
+        "nome_int": "Interno 450 ppm",
+        "nome_ext": "Externo {:.0f} ppm",
+    },
+]
+
+
+def mean_by_point(df_filtrado):
+    return (
+        df_filtrado.groupby("pontos")[[spec["coluna"] for spec in MEAN_CHART_SPECS]]
         .mean()
         .reset_index()
     )
 
-    fig_temp = go.Figure()
-    fig_temp.add_trace(go.Bar(x=df_mean["pontos"], y=df_mean["Temperatura (°C)"], name="Temperatura Média", marker_color="tomato"))
-    linhas_ref_x(fig_temp, df_mean["pontos"], ref_tipo, INTERNAL_REFERENCES["temp"], ext_temp, "Interno 23°C", f"Externo {ext_temp:.1f}°C")
-    fig_temp.update_layout(title="Temperatura Média vs Referências", yaxis_title="°C")
 
-    fig_umid = go.Figure()
-    fig_umid.add_trace(go.Bar(x=df_mean["pontos"], y=df_mean["RH (%)"], name="Umidade Média", marker_color="skyblue"))
-    linhas_ref_x(fig_umid, df_mean["pontos"], ref_tipo, INTERNAL_REFERENCES["umid"], ext_ur, "Interno 52,5%", f"Externo {ext_ur:.1f}%")
-    fig_umid.update_layout(title="Umidade Relativa Média vs Referências", yaxis_title="%")
+def external_references(ext_temp, ext_ur, ext_co2):
+    return {"temp": ext_temp, "umid": ext_ur, "co2": ext_co2}
+
+
+def chart_means(df_filtrado, ref_tipo, ext_temp, ext_ur, ext_co2):
+    df_mean = mean_by_point(df_filtrado)
+    ext = external_references(ext_temp, ext_ur, ext_co2)
+
+    figs = []
+    for spec in MEAN_CHART_SPECS:
+        fig = go.Figure()
+        fig.add_trace(go.Bar(x=df_mean["pontos"], y=df_mean[spec["coluna"]], name=spec["nome"], marker_color=spec["cor"]))
+        linhas_ref_x(
+            fig,
+            df_mean["pontos"],
+            ref_tipo,
+            INTERNAL_REFERENCES[spec["key"]],
+            ext[spec["key"]],
+            spec["nome_int"],
+            spec["nome_ext"].format(ext[spec["key"]]),
+        )
+        fig.update_layout(title=spec["titulo"], yaxis_title=spec["unidade"])
+        figs.append(fig)
 
-    fig_co2 = go.Figure()
-    fig_co2.add_trace(go.Bar(x=df_mean["pontos"], y=df_mean["CO2 (ppm)"], name="CO₂ Médio", marker_color="lightgreen"))
-    linhas_ref_x(fig_co2, df_mean["pontos"], ref_tipo, INTERNAL_REFERENCES["co2"], ext_co2, "Interno 450 ppm", f"Externo {ext_co2:.0f} ppm")
-    fig_co2.update_layout(title="CO₂ Médio vs Referências", yaxis_title="ppm")
+    fig_temp, fig_umid, fig_co2 = figs
+    return fig_temp, fig_umid, fig_co2
 
-    return fig_temp, fig_umid, fig_co2
\ No newline at end of file
+
+def chart_cube_heatmap(matriz, titulo, unidade, diverging=False):
+    fig = go.Figure(
+        go.Heatmap(
+            z=matriz.to_numpy(),
+            x=matriz.columns.astype(str),
+            y=[str(d) for d in matriz.index],
+            colorscale="RdBu_r" if diverging else "YlOrRd",
+            zmid=0 if diverging else None,
+            colorbar=dict(title=unidade),
+            hovertemplate="%{y} · %{x}<br>%{z:.2f}<extra></extra>",
+        )
+    )
+    fig.update_layout(title=titulo, xaxis_title="Ponto", yaxis_title="Dia", yaxis=dict(type="category"))
+    return fig
+
+
+def chart_cube_trend(matriz, titulo, unidade):
+    fig = go.Figure()
+    for ponto in matriz.columns:
+        fig.add_trace(
+            go.Scatter(
+                x=[str(d) for d in matriz.index],
+                y=matriz[ponto],
+                mode="lines+markers",
+                name=str(ponto),
+            )
+        )
+    fig.update_layout(title=titulo, xaxis_title="Dia", yaxis_title=unidade, xaxis=dict(type="category"))
+    return fig
+
+
+def chart_external_delta(df_filtrado, referencia, delta, unidade):
+    # diferença interno − externo de cada leitura, com a hora da estação mais próxima
+    dados = pd.DataFrame(
+        {
+            "pontos": df_filtrado["pontos"].to_numpy(),
+            "DataHora": df_filtrado["DataHora"].to_numpy(),
+            "delta": referencia[delta].to_numpy(),
+        }
+    ).sort_values("DataHora")
+
+    fig = go.Figure()
+    for ponto, grupo in dados.groupby("pontos", sort=True):
+        fig.add_trace(go.Scatter(x=grupo["DataHora"], y=grupo["delta"], mode="lines+markers", name=str(ponto)))
+    fig.add_hline(y=0, line=dict(color="gray", width=2, dash="dot"))
+    fig.update_layout(
+        title=f"{delta}: interno − externo (INMET)",
+        xaxis_title="Horário",
+        yaxis_title=unidade,
+    )
+    return fig
@@ -0,0 +1,38 @@
+import pandas as pd
+import streamlit as st
+
+from anomalies import valid_readings
+
+CUBE_STATISTICS = {
+    "mean": "Média",
+    "std": "Desvio Padrão",
+    "median": "Mediana",
+    "min": "Mínimo",
+    "max": "Máximo",
+    "amplitude": "Amplitude",
+    "count": "Leituras",
+}
+
+
+@st.cache_data(show_spinner=False)
+def build_cube(_df: pd.DataFrame, versao: str, variaveis: tuple, excluir_falhas: bool = True) -> pd.DataFrame:
+    # índice (Data, pontos) × colunas (variável, estatística); montado uma vez por versão da base
+    df = valid_readings(_df) if excluir_falhas else _df
+    cube = (
+        df.groupby(["Data", "pontos"], observed=True, sort=True)[list(variaveis)]
+        .agg(["mean", "std", "median", "min", "max", "count"])
+    )
+    for variavel in variaveis:
+        cube[(variavel, "amplitude")] = cube[(variavel, "max")] - cube[(variavel, "min")]
+    return cube.sort_index(axis=1)
+
+
+def cube_matrix(cube: pd.DataFrame, variavel: str, estatistica: str, pontos_sel=None) -> pd.DataFrame:
+    matriz = cube[(variavel, estatistica)].unstack("pontos")
+    if pontos_sel is not None:
+        matriz = matriz[[p for p in matriz.columns if p in pontos_sel]]
+    return matriz
+
+
+def day_over_day(matriz: pd.DataFrame) -> pd.DataFrame:
+    return matriz.diff()
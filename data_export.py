@@ -0,0 +1,150 @@
+import csv
+from io import BytesIO
+from urllib.parse import urlencode
+
+import numpy as np
+import pandas as pd
+
+from settings import EXPORT_CHUNK_ROWS
+
+EXPORT_COLUMNS = [
+    "pontos",
+    "DataHora",
+    "Temperatura (°C)",
+    "Classificação Temp",
+    "RH (%)",
+    "Classificação RH",
+    "CO2 (ppm)",
+    "Classificação CO2",
+    "Ponto de Orvalho (°C)",
+    "Falha Sensor",
+    "Motivo Falha",
+    "Lacuna",
+    "Arquivo",
+]
+
+CSV_OPTIONS = {
+    "quoting": csv.QUOTE_MINIMAL,
+    "lineterminator": "\n",
+    "date_format": "%Y-%m-%d %H:%M:%S",
+}
+
+EXPORT_FORMATS = {
+    "csv": {"mime": "text/csv", "extensao": "csv"},
+    "parquet": {"mime": "application/vnd.apache.parquet", "extensao": "parquet"},
+}
+
+
+def select_positions(df: pd.DataFrame, data_inicio, data_fim, pontos_sel, hora_sel="Todos") -> np.ndarray:
+    # só as posições das linhas são materializadas; os dados saem em blocos.
+    # o período é testado nos dias distintos da categoria "Data", não em cada linha
+    dias = pd.to_datetime(df["Data"].cat.categories)
+    no_periodo = (dias >= pd.Timestamp(data_inicio)) & (dias <= pd.Timestamp(data_fim))
+    # código -1 (sem data) cai na posição extra, sempre fora do período
+    mask = np.append(no_periodo, False)[df["Data"].cat.codes.to_numpy()]
+    mask &= df["pontos"].isin(pontos_sel).to_numpy()
+    if hora_sel != "Todos":
+        mask &= (df["HoraStr"] == hora_sel).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def export_url(base_url: str, formato: str, data_inicio, data_fim, pontos_sel, hora_sel="Todos") -> str:
+    # mesmos filtros do painel, no formato aceito por /api/exportar.*
+    params = {
+        "inicio": data_inicio.isoformat(),
+        "fim": data_fim.isoformat(),
+        "pontos": ",".join(pontos_sel),
+    }
+    if hora_sel != "Todos":
+        params["data"] = data_inicio.isoformat()
+        params["hora"] = hora_sel
+    return f"{base_url}/api/exportar.{formato}?{urlencode(params)}"
+
+
+def _iter_frames(df: pd.DataFrame, positions, chunk_rows: int):
+    columns = [col for col in EXPORT_COLUMNS if col in df.columns]
+    for inicio in range(0, len(positions), chunk_rows):
+        yield df.take(positions[inicio:inicio + chunk_rows])[columns]
+
+
+def iter_csv(df: pd.DataFrame, positions, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    columns = [col for col in EXPORT_COLUMNS if col in df.columns]
+    # cabeçalho e blocos passam pelo mesmo escritor, com a mesma regra de aspas;
+    # BOM para o Excel reconhecer UTF-8 ao abrir o arquivo
+    yield ("\ufeff" + df.iloc[:0][columns].to_csv(index=False, **CSV_OPTIONS)).encode("utf-8")
+    for chunk in _iter_frames(df, positions, chunk_rows):
+        yield chunk.to_csv(index=False, header=False, **CSV_OPTIONS).encode("utf-8")
+
+
+class _ChunkSink:
+    # arquivo somente escrita que entrega o que foi escrito a cada bloco
+    def __init__(self):
+        self._buffer = BytesIO()
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._buffer.write(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def drain(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer = BytesIO()
+        return data
+
+
+def iter_parquet(df: pd.DataFrame, positions, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for chunk in _iter_frames(df, positions, chunk_rows):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(sink, table.schema, compression="zstd")
+            # cada bloco vira um row group e é enviado assim que escrito
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+
+        if writer is None:
+            empty = df.iloc[:0][[col for col in EXPORT_COLUMNS if col in df.columns]]
+            table = pa.Table.from_pandas(empty, preserve_index=False)
+            writer = pq.ParquetWriter(sink, table.schema, compression="zstd")
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def iter_export(df: pd.DataFrame, positions, formato: str, chunk_rows: int = EXPORT_CHUNK_ROWS):
+    if formato == "csv":
+        return iter_csv(df, positions, chunk_rows)
+    if formato == "parquet":
+        return iter_parquet(df, positions, chunk_rows)
+    raise ValueError(f"Formato de exportação não suportado: {formato}")
+
+
+def export_filename(data_inicio, data_fim, formato: str) -> str:
+    periodo = f"{data_inicio}" if data_inicio == data_fim else f"{data_inicio}_a_{data_fim}"
+    return f"leituras_qualidade_ar_{periodo}.{EXPORT_FORMATS[formato]['extensao']}"
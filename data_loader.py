@@ -1,14 +1,36 @@
+import glob
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from pathlib import Path
+
+import numpy as np
 import pandas as pd
 import streamlit as st
+from openpyxl import load_workbook
 
-from settings import EXCEL_PATH
+from anomalies import SensorFaultDetector, flag_anomalies
+from dataset_store import build_lock, open_dataset, read_stamp, temp_path_for, write_dataset
+from timestamps import parse_datahora, split_datahora
+from settings import (
+    CACHE_DIR,
+    DATA_SOURCE,
+    INGEST_CHUNK_ROWS,
+    INGEST_WORKERS,
+    POINTS_COORDS,
+)
 from rules import (
     classificar_temperatura,
     classificar_umidade,
     classificar_co2,
 )
 
+# o DataFrame carregado é compartilhado entre todas as sessões; com copy-on-write,
+# recortes e alterações feitas por uma sessão nunca escrevem no objeto comum
+pd.set_option("mode.copy_on_write", True)
+
 REQUIRED_COLUMNS = [
     "Data-Hora",
     "(Horário Padrão do Brasil)",
@@ -19,6 +41,35 @@ REQUIRED_COLUMNS = [
     "Ponto de Orvalho (°C)",
 ]
 
+TIMESTAMP_COLUMNS = ["Data-Hora", "(Horário Padrão do Brasil)"]
+
+NUMERIC_COLUMNS = [
+    "Temperatura (°C)",
+    "RH (%)",
+    "CO2 (ppm)",
+    "Ponto de Orvalho (°C)",
+]
+
+DERIVED_COLUMNS = [
+    "Índice de Calor (°C)",
+    "Umidade Absoluta (g/m³)",
+    "Humidex",
+    "Ponto de Orvalho Calculado (°C)",
+    "Desvio Ponto de Orvalho (°C)",
+]
+
+# bitmask por leitura dos campos com valor presente no arquivo, mas ilegível
+# (convertido para NaN/NaT); bit i corresponde a COERCED_FIELDS[i]
+COERCED_COLUMN = "Coagidos"
+COERCED_FIELDS = ["DataHora"] + NUMERIC_COLUMNS
+# quantas cópias da mesma leitura (ponto e horário) o próprio arquivo trazia a mais
+DUPLICATES_COLUMN = "Duplicatas"
+
+SUPPORTED_EXTENSIONS = {".xlsx", ".xlsm", ".csv"}
+
+# incrementar quando o formato do cache por arquivo mudar
+PARSER_VERSION = 7
+
 
 def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     df = df.copy()
@@ -26,70 +77,469 @@ def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def validate_columns(df: pd.DataFrame) -> None:
-    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+def _required_for(columns) -> list[str]:
+    # exportações já tratadas (como "dados analisados.csv") trazem DataHora combinado
+    if "DataHora" in columns:
+        return [col for col in REQUIRED_COLUMNS if col not in TIMESTAMP_COLUMNS]
+    return REQUIRED_COLUMNS
+
+
+def _source_columns(columns) -> list[str]:
+    required = _required_for(columns)
+    if "DataHora" in columns:
+        return ["DataHora"] + required
+    return required
+
+
+def validate_columns(df: pd.DataFrame, source=None) -> None:
+    missing = [col for col in _required_for(df.columns) if col not in df.columns]
     if missing:
+        origem = f" ({Path(source).name})" if source is not None else ""
         raise ValueError(
-            "Colunas obrigatórias ausentes no Excel: " + ", ".join(missing)
+            f"Colunas obrigatórias ausentes no Excel{origem}: " + ", ".join(missing)
         )
 
 
-@st.cache_data(show_spinner=False)
-def load_data() -> pd.DataFrame:
-    if not Path(EXCEL_PATH).exists():
-        raise FileNotFoundError(f"Arquivo não encontrado: {EXCEL_PATH}")
+def _is_lock_file(path: Path) -> bool:
+    return path.name.startswith("~$") or path.name.startswith(".~lock")
 
-    df = pd.read_excel(EXCEL_PATH)
-    df = normalize_columns(df)
-    validate_columns(df)
 
-    df["DataHora"] = pd.to_datetime(
-        df["Data-Hora"].astype(str).str.strip() + " " + df["(Horário Padrão do Brasil)"].astype(str).str.strip(),
-        errors="coerce",
+def resolve_sources(source=DATA_SOURCE) -> list[Path]:
+    source_str = str(source)
+    path = Path(source)
+
+    if path.is_dir():
+        files = [p for p in path.iterdir() if p.is_file()]
+    elif glob.has_magic(source_str):
+        files = [Path(p) for p in glob.glob(source_str) if Path(p).is_file()]
+    elif path.exists():
+        files = [path]
+    else:
+        raise FileNotFoundError(f"Arquivo não encontrado: {source}")
+
+    files = sorted(
+        p
+        for p in files
+        if p.suffix.lower() in SUPPORTED_EXTENSIONS and not _is_lock_file(p)
     )
-    df["Data"] = df["DataHora"].dt.date
-    df["Hora"] = df["DataHora"].dt.time
-    df["HoraStr"] = df["DataHora"].dt.strftime("%H:%M:%S")
-
-    numeric_columns = [
-        "Temperatura (°C)",
-        "RH (%)",
-        "CO2 (ppm)",
-        "Ponto de Orvalho (°C)",
-    ]
-    for col in numeric_columns:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    if not files:
+        raise FileNotFoundError(f"Nenhuma planilha ou CSV encontrado em: {source}")
+    return files
+
+
+def source_version(files) -> str:
+    digest = hashlib.sha1(str(PARSER_VERSION).encode())
+    for f in files:
+        stat = Path(f).stat()
+        digest.update(f"{Path(f).resolve()}|{stat.st_mtime_ns}|{stat.st_size}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _find_data_sheet(workbook):
+    # pastas de trabalho de dashboard costumam ter a base em outra aba
+    first = None
+    for sheet in workbook.worksheets:
+        header_row = next(sheet.iter_rows(max_row=1, values_only=True), None)
+        if header_row is None:
+            continue
+        header = [str(h).strip() if h is not None else "" for h in header_row]
+        if first is None:
+            first = (sheet, header)
+        if not [col for col in _required_for(header) if col not in header]:
+            return sheet, header
+    if first is None:
+        return None, []
+    return first
+
+
+def _iter_excel_chunks(path: Path, chunk_rows: int = INGEST_CHUNK_ROWS):
+    # modo somente leitura: as linhas são percorridas sem montar a planilha em memória
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet, header = _find_data_sheet(workbook)
+        validate_columns(pd.DataFrame(columns=header), path)
+        if sheet is None:
+            return
+
+        columns = _source_columns(header)
+        positions = [header.index(col) for col in columns]
+        width = max(positions) + 1
+        project = itemgetter(*positions)
+        empty = (None,) * len(columns)
+
+        buffer = []
+        for row in sheet.iter_rows(min_row=2, max_col=width, values_only=True):
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            values = project(row)
+            if values == empty:
+                continue
+            buffer.append(values)
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame.from_records(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame.from_records(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def _iter_csv_chunks(path: Path, chunk_rows: int = INGEST_CHUNK_ROWS):
+    with open(path, encoding="utf-8-sig", errors="replace") as fh:
+        header = fh.readline()
+    sep = ";" if header.count(";") > header.count(",") else ","
+    decimal = "," if sep == ";" else "."
+
+    raw_columns = pd.read_csv(path, sep=sep, nrows=0, encoding="utf-8-sig").columns
+    by_name = {str(col).strip(): col for col in raw_columns}
+    validate_columns(pd.DataFrame(columns=list(by_name)), path)
+    columns = _source_columns(by_name)
+
+    # com vírgula decimal, uma única célula ilegível faz o pandas devolver a coluna
+    # inteira como texto ("25,0"), que o to_numeric não entende; por isso as colunas
+    # numéricas são lidas como texto e a vírgula é trocada antes da conversão
+    as_text = {by_name[col]: str for col in NUMERIC_COLUMNS} if decimal == "," else None
+    reader = pd.read_csv(
+        path,
+        sep=sep,
+        decimal=decimal,
+        encoding="utf-8-sig",
+        usecols=[by_name[col] for col in columns],
+        dtype=as_text,
+        chunksize=chunk_rows,
+    )
+    for chunk in reader:
+        chunk = normalize_columns(chunk)
+        if as_text:
+            for col in NUMERIC_COLUMNS:
+                chunk[col] = chunk[col].str.replace(",", ".", regex=False)
+        yield chunk
+
+
+def _present(values: pd.Series) -> np.ndarray:
+    texto = values.astype(str).str.strip()
+    return (values.notna() & (texto != "") & (texto.str.lower() != "nan")).to_numpy()
+
+
+def _coerce_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    if "DataHora" in df.columns:
+        datahora = parse_datahora(df["DataHora"])
+        presente = _present(df["DataHora"])
+    else:
+        datahora = parse_datahora(df["Data-Hora"], df["(Horário Padrão do Brasil)"])
+        presente = _present(df["Data-Hora"]) & _present(df["(Horário Padrão do Brasil)"])
+
+    out = pd.DataFrame(
+        {
+            "pontos": df["pontos"].astype(str).str.strip(),
+            "DataHora": datahora,
+        }
+    )
+    coagidos = (presente & datahora.isna().to_numpy()).astype(np.uint8)
+    for bit, col in enumerate(NUMERIC_COLUMNS, start=1):
+        out[col] = pd.to_numeric(df[col], errors="coerce")
+        coagidos |= ((_present(df[col]) & out[col].isna().to_numpy()).astype(np.uint8) << bit)
+    out[COERCED_COLUMN] = coagidos
+    return out
+
+
+def _heat_index(temp: np.ndarray, rh: np.ndarray) -> np.ndarray:
+    # regressão de Rothfusz (NOAA), calculada em °F
+    t = temp * 9 / 5 + 32
+    simples = 0.5 * (t + 61.0 + (t - 68.0) * 1.2 + rh * 0.094)
+
+    hi = (
+        -42.379
+        + 2.04901523 * t
+        + 10.14333127 * rh
+        - 0.22475541 * t * rh
+        - 0.00683783 * t * t
+        - 0.05481717 * rh * rh
+        + 0.00122874 * t * t * rh
+        + 0.00085282 * t * rh * rh
+        - 0.00000199 * t * t * rh * rh
+    )
+    seco = (rh < 13) & (t >= 80) & (t <= 112)
+    hi = np.where(
+        seco,
+        hi - (13 - rh) / 4 * np.sqrt(np.clip(17 - np.abs(t - 95), 0, None) / 17),
+        hi,
+    )
+    umido = (rh > 85) & (t >= 80) & (t <= 87)
+    hi = np.where(umido, hi + (rh - 85) / 10 * (87 - t) / 5, hi)
+
+    hi = np.where((simples + t) / 2 >= 80, hi, simples)
+    return (hi - 32) * 5 / 9
+
+
+def _dew_point(temp: np.ndarray, rh: np.ndarray) -> np.ndarray:
+    # fórmula de Magnus (coeficientes de Sonntag)
+    gamma = np.log(np.where(rh > 0, rh, np.nan) / 100) + 17.62 * temp / (243.12 + temp)
+    return 243.12 * gamma / (17.62 - gamma)
+
+
+def add_derived_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    temp = df["Temperatura (°C)"].to_numpy(dtype=float)
+    rh = df["RH (%)"].to_numpy(dtype=float)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        orvalho = _dew_point(temp, rh)
+        pressao_vapor = 6.112 * np.exp(17.67 * temp / (temp + 243.5)) * rh / 100
+
+        df["Índice de Calor (°C)"] = _heat_index(temp, rh)
+        df["Umidade Absoluta (g/m³)"] = 216.74 * pressao_vapor / (273.15 + temp)
+        df["Humidex"] = temp + 0.5555 * (
+            6.11 * np.exp(5417.7530 * (1 / 273.16 - 1 / (273.15 + orvalho))) - 10
+        )
+        df["Ponto de Orvalho Calculado (°C)"] = orvalho
+        # diferenças grandes indicam sensor de orvalho ou de umidade com defeito
+        df["Desvio Ponto de Orvalho (°C)"] = df["Ponto de Orvalho (°C)"].to_numpy(dtype=float) - orvalho
+
+    return df
+
+
+def _parse_file(path: Path) -> pd.DataFrame:
+    if path.suffix.lower() == ".csv":
+        chunks = _iter_csv_chunks(path)
+    else:
+        chunks = _iter_excel_chunks(path)
+
+    # cada bloco é convertido para tipos numéricos e passa pelo detector de falhas
+    # antes do próximo ser lido; o detector guarda só o último estado de cada ponto
+    detector = SensorFaultDetector()
+    frames = [flag_anomalies(_coerce_chunk(chunk), detector) for chunk in chunks]
+    if frames:
+        out = pd.concat(frames, ignore_index=True)
+    else:
+        out = flag_anomalies(_coerce_chunk(pd.DataFrame(columns=REQUIRED_COLUMNS)), detector)
+    out = add_derived_metrics(out)
+    out["Arquivo"] = path.name
+    return out
+
+
+def _cache_prefix(path: Path) -> str:
+    # o caminho completo entra no nome: "dados.csv" e "dados.xlsx" não dividem cache
+    chave = hashlib.sha1(str(path.resolve()).encode()).hexdigest()[:8]
+    return f"{path.stem[:40]}-{chave}-"
+
+
+def _prune_cache(path: Path, atual: Path) -> None:
+    # cada edição da planilha gera um pickle novo; as gerações anteriores do mesmo
+    # arquivo não são mais lidas por ninguém
+    for antigo in atual.parent.glob(f"{glob.escape(_cache_prefix(path))}*.pkl"):
+        if antigo != atual:
+            try:
+                antigo.unlink()
+            except OSError:
+                pass
+
+
+def _read_file_cached(path: str) -> pd.DataFrame:
+    path = Path(path)
+    cache_file = Path(CACHE_DIR) / f"{_cache_prefix(path)}{source_version([path])}.pkl"
+
+    if cache_file.exists():
+        try:
+            with open(cache_file, "rb") as fh:
+                return pickle.load(fh)
+        except Exception:
+            cache_file.unlink(missing_ok=True)
+
+    df = _parse_file(path)
+
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = temp_path_for(cache_file)
+        try:
+            with open(tmp_file, "wb") as fh:
+                pickle.dump(df, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_file, cache_file)
+        finally:
+            tmp_file.unlink(missing_ok=True)
+        _prune_cache(path, cache_file)
+    except OSError:
+        pass
+
+    return df
+
+
+def _read_sources(files) -> pd.DataFrame:
+    if len(files) == 1:
+        frames = [_read_file_cached(files[0])]
+    else:
+        workers = min(len(files), INGEST_WORKERS or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(_read_file_cached, files))
+
+    df = pd.concat(frames, ignore_index=True)
+
+    copias = df.groupby(["Arquivo", "pontos", "DataHora"], sort=False).transform("size")
+    df[DUPLICATES_COLUMN] = (copias.fillna(1) - 1).astype(np.int32)
+
+    # a mesma leitura pode vir em mais de um arquivo (ex.: base e dashboard)
+    duplicated = df.duplicated(subset=["pontos", "DataHora"], keep="last")
+    df = df[~(duplicated & df["DataHora"].notna())].reset_index(drop=True)
+    df["Arquivo"] = df["Arquivo"].astype("category")
+    return df
+
+
+def _build_dataset(files) -> pd.DataFrame:
+    df = _read_sources(list(files))
+
+    for col, values in split_datahora(df["DataHora"]).items():
+        df[col] = values
 
     df["Classificação Temp"] = df["Temperatura (°C)"].apply(classificar_temperatura)
     df["Classificação RH"] = df["RH (%)"].apply(classificar_umidade)
     df["Classificação CO2"] = df["CO2 (ppm)"].apply(classificar_co2)
 
-    df["pontos"] = df["pontos"].astype(str).str.strip()
-
+    # ordenado por dia, cada sessão recorta o seu dia como fatia contígua, sem cópia
+    df = df.sort_values(["Data", "pontos", "DataHora"], kind="stable").reset_index(drop=True)
     return df
 
 
+def ingest(source=DATA_SOURCE, force: bool = False) -> dict:
+    files = resolve_sources(source)
+    versao = source_version(files)
+
+    stamp = read_stamp()
+    if not force and stamp is not None and stamp["versao"] == versao:
+        return stamp
+
+    # várias sessões e processos veem a versão nova ao mesmo tempo; só o primeiro
+    # reconstrói a base, os demais esperam e reaproveitam o carimbo que ele gravou
+    with build_lock():
+        stamp = read_stamp()
+        if not force and stamp is not None and stamp["versao"] == versao:
+            return stamp
+        return write_dataset(_build_dataset(files), versao)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _open_dataset(versao: str) -> pd.DataFrame:
+    return open_dataset(versao)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _load_files(files: tuple[str, ...], versao: str) -> pd.DataFrame:
+    return _build_dataset(files)
+
+
+def load_data(source=DATA_SOURCE) -> pd.DataFrame:
+    # a base é gravada uma vez em Arrow IPC e mapeada por todos os processos;
+    # quando o carimbo de versão muda, a próxima chamada já abre o arquivo novo
+    try:
+        stamp = ingest(source)
+    except OSError:
+        files = resolve_sources(source)
+        return _load_files(tuple(str(f) for f in files), source_version(files))
+    return _open_dataset(stamp["versao"])
+
+
+def dataset_version(source=DATA_SOURCE) -> str:
+    return source_version(resolve_sources(source))
+
+
+def day_slice(df: pd.DataFrame, data_sel) -> pd.DataFrame:
+    categorias = df["Data"].cat.categories
+    if data_sel not in categorias:
+        return df.iloc[:0]
+
+    alvo = categorias.get_loc(data_sel)
+    codes = df["Data"].cat.codes.to_numpy()
+    # linhas sem data (código -1) ficam no fim da base ordenada
+    validos = codes[: np.count_nonzero(codes >= 0)]
+    if (validos[:-1] > validos[1:]).any() or (codes[len(validos):] >= 0).any():
+        return df[codes == alvo]
+
+    inicio = np.searchsorted(validos, alvo, side="left")
+    fim = np.searchsorted(validos, alvo, side="right")
+    return df.iloc[inicio:fim]
+
+
 def filter_data(df: pd.DataFrame, data_sel, pontos_sel, hora_sel):
-    filtrado = df[(df["Data"] == data_sel) & (df["pontos"].isin(pontos_sel))].copy()
+    filtrado = day_slice(df, data_sel)
+
+    mask = None
+    if set(filtrado["pontos"].unique()) - set(pontos_sel):
+        mask = filtrado["pontos"].isin(pontos_sel).to_numpy()
     if hora_sel != "Todos":
-        filtrado = filtrado[filtrado["HoraStr"] == hora_sel].copy()
-    return filtrado
+        hora_mask = (filtrado["HoraStr"] == hora_sel).to_numpy()
+        mask = hora_mask if mask is None else mask & hora_mask
+
+    return filtrado if mask is None else filtrado[mask]
+
+
+STATISTICS_COLUMNS = ["Ponto", "Média", "Desvio Padrão", "Mediana", "Amplitude"]
 
 
-def build_statistics(df_filtrado: pd.DataFrame, col_sel: str) -> pd.DataFrame:
+def statistics_table(df_filtrado: pd.DataFrame, colunas) -> pd.DataFrame:
+    # uma única passada com agregações nativas do groupby; amplitude = máx − mín
+    colunas = list(colunas)
     if df_filtrado.empty:
-        return pd.DataFrame(columns=["Ponto", "Média", "Desvio Padrão", "Mediana", "Amplitude"])
-
-    estat = (
-        df_filtrado.groupby("pontos")[col_sel]
-        .agg(
-            mean="mean",
-            std="std",
-            median="median",
-            amplitude=lambda x: x.max() - x.min(),
+        return pd.DataFrame(columns=["Ponto", "Variável"] + STATISTICS_COLUMNS[1:])
+
+    agg = df_filtrado.groupby("pontos", sort=True)[colunas].agg(["mean", "std", "median", "min", "max"])
+    agg.columns.names = ["Variável", None]
+    tidy = agg.stack(level="Variável", future_stack=True)
+    tidy["amplitude"] = tidy["max"] - tidy["min"]
+
+    tidy = tidy.reset_index()[["pontos", "Variável", "mean", "std", "median", "amplitude"]]
+    tidy.columns = ["Ponto", "Variável"] + STATISTICS_COLUMNS[1:]
+    return tidy
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_statistics_table(_df_filtrado: pd.DataFrame, chave: tuple, colunas: tuple) -> pd.DataFrame:
+    return statistics_table(_df_filtrado, colunas)
+
+
+def build_statistics(df_filtrado: pd.DataFrame, col_sel: str, chave=None, colunas=None) -> pd.DataFrame:
+    # com uma chave (versão da base + filtros), todas as variáveis são calculadas de uma vez
+    # e trocar de variável passa a ser só uma seleção na tabela em cache
+    if chave is None:
+        tabela = statistics_table(df_filtrado, [col_sel])
+    else:
+        tabela = _cached_statistics_table(df_filtrado, chave, tuple(colunas or (col_sel,)))
+
+    estat = tabela[tabela["Variável"] == col_sel][STATISTICS_COLUMNS].reset_index(drop=True)
+    return estat.fillna(0)
+
+
+def _safe_round(value, ndigits=2):
+    if value is None:
+        return 0
+    try:
+        if value != value:
+            return 0
+    except Exception:
+        pass
+    return round(float(value), ndigits)
+
+
+def build_point_summaries(df_filtrado, pontos_sel, col_sel, variavel):
+    # desvio de uma leitura isolada é 0, não indefinido
+    estat = statistics_table(df_filtrado, [col_sel]).fillna({"Desvio Padrão": 0.0}).set_index("Ponto")
+    summaries = []
+
+    for nome, coords in POINTS_COORDS.items():
+        if nome not in pontos_sel:
+            continue
+        if nome not in estat.index:
+            continue
+
+        linha = estat.loc[nome]
+        summaries.append(
+            {
+                "nome": nome,
+                "lat": coords["lat"],
+                "lon": coords["lon"],
+                "variavel": variavel,
+                "media": _safe_round(linha["Média"], 2),
+                "std": _safe_round(linha["Desvio Padrão"], 2),
+                "mediana": _safe_round(linha["Mediana"], 2),
+                "amplitude": _safe_round(linha["Amplitude"], 2),
+            }
         )
-        .reset_index()
-    )
 
-    estat.columns = ["Ponto", "Média", "Desvio Padrão", "Mediana", "Amplitude"]
-    return estat.fillna(0)
\ No newline at end of file
+    return summaries
@@ -0,0 +1,158 @@
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+
+from settings import DATASET_STORE_DIR, DATASET_STORE_KEEP
+
+try:
+    import fcntl
+except ImportError:  # Windows: só o lock do próprio processo
+    fcntl = None
+
+STAMP_NAME = "dataset.version"
+LOCK_NAME = "dataset.lock"
+SHARED_FILE_MODE = 0o644
+
+_build_lock = threading.Lock()
+
+
+def _stamp_path(store_dir=DATASET_STORE_DIR) -> Path:
+    return Path(store_dir) / STAMP_NAME
+
+
+def _dataset_path(versao: str, store_dir=DATASET_STORE_DIR) -> Path:
+    return Path(store_dir) / f"dataset-{versao}.arrow"
+
+
+def temp_path_for(path: Path) -> Path:
+    # nome único por chamada: threads do mesmo processo nunca escrevem no mesmo arquivo
+    fd, tmp = tempfile.mkstemp(dir=Path(path).parent, prefix=f"{Path(path).name}.", suffix=".tmp")
+    os.close(fd)
+    # o mkstemp cria o arquivo só para o dono, e o os.replace mantém o modo; a base
+    # é lida por processos de outras contas, então fica legível para todos
+    os.chmod(tmp, SHARED_FILE_MODE)
+    return Path(tmp)
+
+
+def _replace_atomically(path: Path, write) -> None:
+    tmp = temp_path_for(path)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # NaN fica como valor (e não como nulo) para a leitura em pandas não precisar de cópia
+    for i, name in enumerate(table.column_names):
+        if df[name].dtype.kind == "f":
+            table = table.set_column(
+                i, table.field(i), pa.array(df[name].to_numpy(), from_pandas=False)
+            )
+    return table
+
+
+@contextmanager
+def build_lock(store_dir=DATASET_STORE_DIR):
+    # uma única reconstrução por vez: entre threads pelo lock do processo e
+    # entre processos pelo lock de arquivo na pasta da base
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    with _build_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(store_dir / LOCK_NAME, "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def read_stamp(store_dir=DATASET_STORE_DIR) -> dict | None:
+    try:
+        with open(_stamp_path(store_dir), encoding="utf-8") as fh:
+            stamp = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if not _dataset_path(stamp.get("versao", ""), store_dir).exists():
+        return None
+    return stamp
+
+
+def write_dataset(df: pd.DataFrame, versao: str, store_dir=DATASET_STORE_DIR) -> dict:
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    table = _to_table(df)
+
+    def write_ipc(tmp):
+        # sem compressão: o arquivo é mapeado e lido diretamente pelos processos
+        with pa.OSFile(str(tmp), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    _replace_atomically(_dataset_path(versao, store_dir), write_ipc)
+
+    stamp = {
+        "versao": versao,
+        "arquivo": _dataset_path(versao, store_dir).name,
+        "linhas": len(df),
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+    }
+
+    def write_stamp(tmp):
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(stamp, fh, ensure_ascii=False)
+
+    # o carimbo só muda depois que o arquivo novo está completo no lugar
+    _replace_atomically(_stamp_path(store_dir), write_stamp)
+    _prune(store_dir, versao)
+    return stamp
+
+
+def _prune(store_dir: Path, atual: str) -> None:
+    # versões antigas ainda mapeadas por outro processo continuam válidas até serem fechadas
+    arquivos = sorted(
+        (p for p in store_dir.glob("dataset-*.arrow") if p != _dataset_path(atual, store_dir)),
+        key=lambda p: p.stat().st_mtime,
+        reverse=True,
+    )
+    for path in arquivos[max(0, DATASET_STORE_KEEP - 1):]:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+
+def open_dataset(versao: str, store_dir=DATASET_STORE_DIR) -> pd.DataFrame:
+    source = pa.memory_map(str(_dataset_path(versao, store_dir)), "r")
+    table = pa.ipc.open_file(source).read_all()
+    # colunas numéricas sem nulos viram arrays somente leitura sobre o próprio mapeamento
+    return table.to_pandas(split_blocks=True)
+
+
+def main():
+    import argparse
+
+    from data_loader import ingest
+
+    parser = argparse.ArgumentParser(description="Gera a base consolidada (Arrow IPC) usada pelo app e pela API.")
+    parser.add_argument("--forcar", action="store_true", help="regrava mesmo que a versão não tenha mudado")
+    args = parser.parse_args()
+
+    stamp = ingest(force=args.forcar)
+    print(f"Base {stamp['versao']} com {stamp['linhas']} leituras em {Path(DATASET_STORE_DIR) / stamp['arquivo']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+from base64 import b64encode
+from functools import lru_cache
+from io import BytesIO
+from math import cos, radians, sqrt
+from time import perf_counter
+
+import numpy as np
+from PIL import Image
+
+from settings import (
+    IDW_BUDGET_MS,
+    IDW_GRID_MAX,
+    IDW_GRID_MIN,
+    IDW_MARGIN,
+    IDW_OPACITY,
+    IDW_POWER,
+    POINTS_COORDS,
+)
+
+# verde -> amarelo -> vermelho, do menor para o maior valor
+COLOR_STOPS = np.array(
+    [
+        [26, 150, 65],
+        [255, 214, 0],
+        [215, 25, 28],
+    ],
+    dtype=np.float64,
+)
+
+# custo medido por célula×ponto (ms), atualizado a cada cálculo
+_grid_cost = {"ms_per_unit": 5e-5}
+
+
+def surface_bounds(coords=None, margin=IDW_MARGIN):
+    coords = POINTS_COORDS if coords is None else coords
+    lats = [c["lat"] for c in coords.values()]
+    lons = [c["lon"] for c in coords.values()]
+    pad_lat = max((max(lats) - min(lats)) * margin, 0.001)
+    pad_lon = max((max(lons) - min(lons)) * margin, 0.001)
+    return (
+        min(lats) - pad_lat,
+        min(lons) - pad_lon,
+        max(lats) + pad_lat,
+        max(lons) + pad_lon,
+    )
+
+
+def idw_grid(lats, lons, values, bounds, shape, power=IDW_POWER):
+    south, west, north, east = bounds
+    rows, cols = shape
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+
+    # graus de longitude encolhem com a latitude; corrige para distâncias isotrópicas
+    kx = cos(radians((south + north) / 2.0))
+    grid_lat = np.linspace(north, south, rows)[:, None, None]
+    grid_lon = np.linspace(west, east, cols)[None, :, None]
+
+    d2 = (grid_lat - lats) ** 2 + ((grid_lon - lons) * kx) ** 2
+    with np.errstate(divide="ignore"):
+        weights = d2 ** (-power / 2.0)
+
+    exact = ~np.isfinite(weights)
+    if exact.any():
+        # célula exatamente sobre um ponto: usa o valor medido
+        weights = np.where(exact.any(axis=2, keepdims=True), exact.astype(np.float64), weights)
+
+    return (weights * values).sum(axis=2) / weights.sum(axis=2)
+
+
+def _colorize(grid, vmin, vmax, opacity=IDW_OPACITY) -> Image.Image:
+    span = vmax - vmin
+    norm = np.zeros_like(grid) if span <= 0 else np.clip((grid - vmin) / span, 0.0, 1.0)
+
+    pos = norm * (len(COLOR_STOPS) - 1)
+    idx = np.minimum(pos.astype(np.int64), len(COLOR_STOPS) - 2)
+    frac = (pos - idx)[..., None]
+    rgb = COLOR_STOPS[idx] * (1.0 - frac) + COLOR_STOPS[idx + 1] * frac
+
+    rgba = np.empty(grid.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = rgb.round().astype(np.uint8)
+    rgba[..., 3] = int(round(255 * opacity))
+    return Image.fromarray(rgba, mode="RGBA")
+
+
+def _grid_size(n_points: int) -> int:
+    # o custo cresce com células (n²) × pontos; escolhe n para caber no orçamento
+    units = IDW_BUDGET_MS * 0.8 / (_grid_cost["ms_per_unit"] * max(n_points, 1))
+    return int(max(IDW_GRID_MIN, min(IDW_GRID_MAX, sqrt(units))))
+
+
+def _update_cost(elapsed_ms: float, n: int, n_points: int) -> None:
+    measured = elapsed_ms / (n * n * max(n_points, 1))
+    _grid_cost["ms_per_unit"] = 0.5 * _grid_cost["ms_per_unit"] + 0.5 * measured
+
+
+@lru_cache(maxsize=64)
+def _cached_surface(data_sel, hora_sel, col_sel, pontos: tuple, valores: tuple):
+    lats = [p[1] for p in pontos]
+    lons = [p[2] for p in pontos]
+    bounds = surface_bounds()
+
+    n = _grid_size(len(pontos))
+    inicio = perf_counter()
+    grid = idw_grid(lats, lons, valores, bounds, (n, n))
+    elapsed_ms = (perf_counter() - inicio) * 1000.0
+    _update_cost(elapsed_ms, n, len(pontos))
+
+    vmin, vmax = min(valores), max(valores)
+    image = _colorize(grid, vmin, vmax)
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+
+    return {
+        "bounds": bounds,
+        "image": image,
+        "png": buffer.getvalue(),
+        "vmin": vmin,
+        "vmax": vmax,
+        "grid_size": n,
+        "elapsed_ms": elapsed_ms,
+    }
+
+
+def build_surface(df_filtrado, col_sel, pontos_sel, data_sel=None, hora_sel=None):
+    medias = df_filtrado.groupby("pontos")[col_sel].mean().dropna()
+
+    pontos = []
+    valores = []
+    for nome, coords in POINTS_COORDS.items():
+        if nome not in pontos_sel or nome not in medias.index:
+            continue
+        pontos.append((nome, coords["lat"], coords["lon"]))
+        valores.append(round(float(medias[nome]), 6))
+
+    if len(pontos) < 2:
+        return None
+
+    return _cached_surface(data_sel, hora_sel, col_sel, tuple(pontos), tuple(valores))
+
+
+def surface_data_url(superficie) -> str:
+    return "data:image/png;base64," + b64encode(superficie["png"]).decode("utf-8")
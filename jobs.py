@@ -0,0 +1,109 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import streamlit as st
+
+from settings import REPORT_JOBS_RETAINED, REPORT_MAX_WORKERS
+
+PENDING = "pendente"
+RUNNING = "executando"
+DONE = "concluído"
+FAILED = "erro"
+
+
+@dataclass
+class ReportJob:
+    key: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = PENDING
+    stage: str = "Na fila"
+    progress: float = 0.0
+    result: bytes | None = None
+    error: str | None = None
+    timings: dict = field(default_factory=dict)
+    stats: dict = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    @property
+    def in_flight(self) -> bool:
+        return self.status in (PENDING, RUNNING)
+
+
+def job_key(*parts) -> str:
+    payload = json.dumps(parts, default=str, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class ReportQueue:
+    def __init__(self, max_workers: int = REPORT_MAX_WORKERS, retained: int = REPORT_JOBS_RETAINED):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="relatorio",
+        )
+        self._lock = threading.Lock()
+        self._jobs: dict[str, ReportJob] = {}
+        self._in_flight: dict[str, str] = {}
+        self._retained = retained
+
+    def submit(self, key: str, fn, **kwargs) -> ReportJob:
+        with self._lock:
+            # pedidos idênticos em andamento compartilham o mesmo job
+            job_id = self._in_flight.get(key)
+            if job_id is not None:
+                return self._jobs[job_id]
+
+            job = ReportJob(key=key)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job.id
+            self._prune()
+
+        self._executor.submit(self._run, job, fn, kwargs)
+        return job
+
+    def get(self, job_id: str | None) -> ReportJob | None:
+        if job_id is None:
+            return None
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: ReportJob, fn, kwargs):
+        job.status = RUNNING
+        stage_started = {"nome": None, "inicio": time.perf_counter()}
+
+        def progress(stage: str, fraction: float):
+            agora = time.perf_counter()
+            if stage_started["nome"] is not None:
+                job.timings[stage_started["nome"]] = agora - stage_started["inicio"]
+            stage_started.update(nome=stage, inicio=agora)
+            job.stage = stage
+            job.progress = max(0.0, min(1.0, fraction))
+
+        try:
+            job.result = fn(progress=progress, stats=job.stats, **kwargs)
+            progress("Concluído", 1.0)
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._in_flight.get(job.key) == job.id:
+                    del self._in_flight[job.key]
+
+    def _prune(self):
+        finished = [j for j in self._jobs.values() if not j.in_flight]
+        excess = len(self._jobs) - self._retained
+        for job in sorted(finished, key=lambda j: j.created_at)[:max(0, excess)]:
+            del self._jobs[job.id]
+
+
+@st.cache_resource(show_spinner=False)
+def get_report_queue() -> ReportQueue:
+    return ReportQueue()
@@ -0,0 +1,86 @@
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import streamlit.components.v1 as components
+
+from data_loader import build_point_summaries
+from interpolation import COLOR_STOPS
+from rules import (
+    CORES_CLASSIFICACAO,
+    classificar_co2,
+    classificar_temperatura,
+    classificar_umidade,
+)
+from settings import ASSETS_DIR, LIVE_MAP_HEIGHT, MAP_CENTER, MAP_ZOOM
+
+# página estática com Leaflet: é carregada uma única vez e depois só recebe o JSON dos pontos
+_live_map = components.declare_component("mapa_ao_vivo", path=str(Path(ASSETS_DIR) / "mapa_ao_vivo"))
+
+CLASSIFIERS = {
+    "Temperatura (°C)": classificar_temperatura,
+    "RH (%)": classificar_umidade,
+    "CO2 (ppm)": classificar_co2,
+}
+
+
+def _gradient_colors(valores) -> list[str]:
+    valores = np.asarray(valores, dtype=float)
+    if len(valores) == 0:
+        return []
+    vmin, vmax = np.nanmin(valores), np.nanmax(valores)
+    span = vmax - vmin
+    norm = np.zeros_like(valores) if not span > 0 else np.clip((valores - vmin) / span, 0.0, 1.0)
+    pos = np.nan_to_num(norm) * (len(COLOR_STOPS) - 1)
+    idx = np.minimum(pos.astype(np.int64), len(COLOR_STOPS) - 2)
+    frac = (pos - idx)[:, None]
+    rgb = (COLOR_STOPS[idx] * (1.0 - frac) + COLOR_STOPS[idx + 1] * frac).round().astype(int)
+    return [f"#{r:02x}{g:02x}{b:02x}" for r, g, b in rgb]
+
+
+def live_payload(df_filtrado, col_sel, variavel, pontos_sel, versao=None) -> dict:
+    pontos = build_point_summaries(df_filtrado, pontos_sel, col_sel, variavel)
+
+    classificar = CLASSIFIERS.get(col_sel)
+    if classificar is not None:
+        classes = [classificar(p["media"]) for p in pontos]
+        cores = [CORES_CLASSIFICACAO.get(c, CORES_CLASSIFICACAO["N/D"])[0] for c in classes]
+    else:
+        classes = [None] * len(pontos)
+        cores = _gradient_colors([p["media"] for p in pontos])
+
+    features = [
+        {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [p["lon"], p["lat"]]},
+            "properties": {
+                "nome": p["nome"],
+                "media": p["media"],
+                "std": p["std"],
+                "mediana": p["mediana"],
+                "amplitude": p["amplitude"],
+                "classe": classe,
+                "cor": cor,
+            },
+        }
+        for p, classe, cor in zip(pontos, classes, cores)
+    ]
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "variavel": variavel,
+        "versao": versao,
+        "atualizado_em": datetime.now().strftime("%H:%M:%S"),
+    }
+
+
+def render_live_map(payload: dict, key: str = "mapa_ao_vivo"):
+    # mesma chave a cada atualização: o iframe continua montado e só os argumentos mudam
+    return _live_map(
+        pontos=payload,
+        centro=[MAP_CENTER["lat"], MAP_CENTER["lon"]],
+        zoom=MAP_ZOOM,
+        altura=LIVE_MAP_HEIGHT,
+        key=key,
+        default=None,
+    )
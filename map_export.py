@@ -1,12 +1,14 @@
+from functools import lru_cache
 from io import BytesIO
-from math import cos, log, pi, radians, tan
+from math import cos, floor, log, pi, radians, tan
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 import requests
 from PIL import Image, ImageDraw, ImageFont
 
-from settings import POINTS_COORDS, ICON_PATH
+from data_loader import build_point_summaries
+from settings import ICON_PATH, MAP_BASEMAP_CACHE_SIZE, PDF_DEFAULT_PROFILE, PDF_PROFILES
 
 
 TILE_SIZE = 256
@@ -62,6 +64,7 @@ def _download_tile(z: int, x: int, y: int) -> Image.Image:
     return Image.open(BytesIO(resp.content)).convert("RGB")
 
 
+@lru_cache(maxsize=8)
 def _load_pin_icon(target_height: int = 60) -> Image.Image | None:
     icon_path = Path(ICON_PATH)
     if not icon_path.exists():
@@ -80,6 +83,7 @@ def _load_pin_icon(target_height: int = 60) -> Image.Image | None:
     return icon.resize((new_width, new_height), Image.LANCZOS)
 
 
+@lru_cache(maxsize=16)
 def _load_font(size: int) -> ImageFont.ImageFont:
     try:
         return ImageFont.truetype("arial.ttf", size)
@@ -87,50 +91,6 @@ def _load_font(size: int) -> ImageFont.ImageFont:
         return ImageFont.load_default()
 
 
-def _safe_round(value, ndigits=2):
-    if value is None:
-        return 0
-    try:
-        if value != value:
-            return 0
-    except Exception:
-        pass
-    return round(float(value), ndigits)
-
-
-def _build_point_summaries(df_filtrado, pontos_sel, col_sel, variavel):
-    grouped = df_filtrado.groupby("pontos")
-    summaries = []
-
-    for nome, coords in POINTS_COORDS.items():
-        if nome not in pontos_sel:
-            continue
-        if nome not in grouped.groups:
-            continue
-
-        dados_ponto = grouped.get_group(nome)
-
-        media = _safe_round(dados_ponto[col_sel].mean(), 2)
-        std = _safe_round(dados_ponto[col_sel].std() if len(dados_ponto) > 1 else 0, 2)
-        mediana = _safe_round(dados_ponto[col_sel].median(), 2)
-        amplitude = _safe_round(dados_ponto[col_sel].max() - dados_ponto[col_sel].min(), 2)
-
-        summaries.append(
-            {
-                "nome": nome,
-                "lat": coords["lat"],
-                "lon": coords["lon"],
-                "variavel": variavel,
-                "media": media,
-                "std": std,
-                "mediana": mediana,
-                "amplitude": amplitude,
-            }
-        )
-
-    return summaries
-
-
 def _measure_info_box(draw, point, title_font, body_font):
     linhas = [
         point["nome"],
@@ -236,6 +196,58 @@ def _pick_box_position(
     return cand_x, cand_y, rect
 
 
+# o conjunto de estações é fixo, então zoom e recorte quase sempre se repetem;
+# poucas entradas bastam e cada uma ocupa uma imagem inteira em memória
+@lru_cache(maxsize=MAP_BASEMAP_CACHE_SIZE)
+def _compose_basemap(zoom: int, left: int, top: int, width: int, height: int) -> Image.Image:
+    right = left + width
+    bottom = top + height
+
+    tile_x_min = int(left // TILE_SIZE)
+    tile_y_min = int(top // TILE_SIZE)
+    tile_x_max = int(right // TILE_SIZE)
+    tile_y_max = int(bottom // TILE_SIZE)
+
+    stitched = Image.new(
+        "RGB",
+        (
+            (tile_x_max - tile_x_min + 1) * TILE_SIZE,
+            (tile_y_max - tile_y_min + 1) * TILE_SIZE,
+        ),
+        "white",
+    )
+
+    for tx in range(tile_x_min, tile_x_max + 1):
+        for ty in range(tile_y_min, tile_y_max + 1):
+            tile = _download_tile(zoom, tx, ty)
+            px = (tx - tile_x_min) * TILE_SIZE
+            py = (ty - tile_y_min) * TILE_SIZE
+            stitched.paste(tile, (px, py))
+
+    crop_left = left - tile_x_min * TILE_SIZE
+    crop_top = top - tile_y_min * TILE_SIZE
+    crop_right = crop_left + width
+    crop_bottom = crop_top + height
+
+    return stitched.crop(
+        (crop_left, crop_top, crop_right, crop_bottom)
+    ).convert("RGBA")
+
+
+def _paste_surface(final_map, superficie, zoom, left, top):
+    south, west, north, east = superficie["bounds"]
+    x1, y1 = _latlon_to_world_pixels(north, west, zoom)
+    x2, y2 = _latlon_to_world_pixels(south, east, zoom)
+
+    box_w = max(1, int(round(x2 - x1)))
+    box_h = max(1, int(round(y2 - y1)))
+    overlay = superficie["image"].resize((box_w, box_h), Image.BILINEAR)
+
+    layer = Image.new("RGBA", final_map.size, (0, 0, 0, 0))
+    layer.paste(overlay, (int(round(x1 - left)), int(round(y1 - top))))
+    final_map.alpha_composite(layer)
+
+
 def export_static_map(
     df_filtrado,
     pontos_sel,
@@ -244,11 +256,15 @@ def export_static_map(
     width: int = 1200,
     height: int = 800,
     padding: int = 80,
+    superficie=None,
+    profile: str = PDF_DEFAULT_PROFILE,
 ):
+    perfil = PDF_PROFILES[profile]
     temp_dir = TemporaryDirectory()
-    output_path = Path(temp_dir.name) / "mapa_pontos.png"
+    extensao = "jpg" if perfil["map_format"] == "JPEG" else "png"
+    output_path = Path(temp_dir.name) / f"mapa_pontos.{extensao}"
 
-    selected_points = _build_point_summaries(
+    selected_points = build_point_summaries(
         df_filtrado=df_filtrado,
         pontos_sel=pontos_sel,
         col_sel=col_sel,
@@ -281,40 +297,14 @@ def export_static_map(
         center_x = (min(xs) + max(xs)) / 2.0
         center_y = (min(ys) + max(ys)) / 2.0
 
-    left = center_x - width / 2.0
-    top = center_y - height / 2.0
-    right = center_x + width / 2.0
-    bottom = center_y + height / 2.0
-
-    tile_x_min = int(left // TILE_SIZE)
-    tile_y_min = int(top // TILE_SIZE)
-    tile_x_max = int(right // TILE_SIZE)
-    tile_y_max = int(bottom // TILE_SIZE)
-
-    stitched = Image.new(
-        "RGB",
-        (
-            (tile_x_max - tile_x_min + 1) * TILE_SIZE,
-            (tile_y_max - tile_y_min + 1) * TILE_SIZE,
-        ),
-        "white",
-    )
-
-    for tx in range(tile_x_min, tile_x_max + 1):
-        for ty in range(tile_y_min, tile_y_max + 1):
-            tile = _download_tile(zoom, tx, ty)
-            px = (tx - tile_x_min) * TILE_SIZE
-            py = (ty - tile_y_min) * TILE_SIZE
-            stitched.paste(tile, (px, py))
+    left = floor(center_x - width / 2.0)
+    top = floor(center_y - height / 2.0)
 
-    crop_left = int(left - tile_x_min * TILE_SIZE)
-    crop_top = int(top - tile_y_min * TILE_SIZE)
-    crop_right = crop_left + width
-    crop_bottom = crop_top + height
+    # cópia: o mosaico em cache não pode receber os desenhos desta exportação
+    final_map = _compose_basemap(zoom, left, top, width, height).copy()
 
-    final_map = stitched.crop(
-        (crop_left, crop_top, crop_right, crop_bottom)
-    ).convert("RGBA")
+    if superficie is not None:
+        _paste_surface(final_map, superficie, zoom, left, top)
 
     draw = ImageDraw.Draw(final_map)
     pin_icon = _load_pin_icon(target_height=60)
@@ -408,5 +398,33 @@ def export_static_map(
             width=2,
         )
 
-    final_map.convert("RGB").save(output_path, format="PNG", optimize=True)
-    return temp_dir, output_path
\ No newline at end of file
+    _save_map(final_map.convert("RGB"), output_path, perfil)
+    return temp_dir, output_path
+
+
+def _save_map(image: Image.Image, output_path: Path, perfil: dict) -> None:
+    if perfil["map_scale"] != 1.0:
+        size = (
+            max(1, int(image.width * perfil["map_scale"])),
+            max(1, int(image.height * perfil["map_scale"])),
+        )
+        image = image.resize(size, Image.LANCZOS)
+
+    if perfil["map_format"] == "JPEG":
+        image.save(
+            output_path,
+            format="JPEG",
+            quality=perfil["jpeg_quality"],
+            optimize=True,
+            progressive=True,
+        )
+        return
+
+    if perfil["palette_colors"]:
+        # mapa base e caixas têm poucas cores: a paleta reduz bastante o PNG
+        image = image.quantize(
+            colors=perfil["palette_colors"],
+            method=Image.Quantize.MEDIANCUT,
+            dither=Image.Dither.NONE,
+        )
+    image.save(output_path, format="PNG", optimize=True)
\ No newline at end of file
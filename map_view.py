@@ -5,7 +5,9 @@ import folium
 import streamlit as st
 from folium.features import CustomIcon
 
-from settings import POINTS_COORDS, ICON_PATH
+from data_loader import build_point_summaries
+from interpolation import surface_data_url
+from settings import ICON_PATH
 
 
 def _build_icon():
@@ -24,46 +26,24 @@ def _build_icon():
     )
 
 
-def render_map(df_filtrado, col_sel, variavel, pontos_sel):
-    grouped = df_filtrado.groupby("pontos")
-
+def build_map(df_filtrado, col_sel, variavel, pontos_sel, superficie=None):
     pontos_mapa = []
-    for ponto_nome, coords in POINTS_COORDS.items():
-        if ponto_nome not in pontos_sel:
-            continue
-        if ponto_nome not in grouped.groups:
-            continue
-
-        dados_ponto = grouped.get_group(ponto_nome)
-
-        media = round(dados_ponto[col_sel].mean(), 2)
-        std = round(dados_ponto[col_sel].std() if len(dados_ponto) > 1 else 0, 2)
-        mediana = round(dados_ponto[col_sel].median(), 2)
-        amplitude = round(dados_ponto[col_sel].max() - dados_ponto[col_sel].min(), 2)
-
+    for p in build_point_summaries(df_filtrado, pontos_sel, col_sel, variavel):
         popup = f"""
         <div style="font-size:14px;">
-            <b>{ponto_nome}</b><br>
+            <b>{p["nome"]}</b><br>
             {variavel}:<br>
-            Média: {media}<br>
-            Desvio Padrão: {std}<br>
-            Mediana: {mediana}<br>
-            Amplitude: {amplitude}
+            Média: {p["media"]}<br>
+            Desvio Padrão: {p["std"]}<br>
+            Mediana: {p["mediana"]}<br>
+            Amplitude: {p["amplitude"]}
         </div>
         """
 
-        pontos_mapa.append(
-            {
-                "nome": ponto_nome,
-                "lat": coords["lat"],
-                "lon": coords["lon"],
-                "popup": popup,
-            }
-        )
+        pontos_mapa.append({**p, "popup": popup})
 
     if not pontos_mapa:
-        st.warning("Nenhum ponto disponível para exibir no mapa.")
-        return
+        return None
 
     lat_media = sum(p["lat"] for p in pontos_mapa) / len(pontos_mapa)
     lon_media = sum(p["lon"] for p in pontos_mapa) / len(pontos_mapa)
@@ -74,6 +54,16 @@ def render_map(df_filtrado, col_sel, variavel, pontos_sel):
         tiles="OpenStreetMap",
     )
 
+    if superficie is not None:
+        south, west, north, east = superficie["bounds"]
+        folium.raster_layers.ImageOverlay(
+            image=surface_data_url(superficie),
+            bounds=[[south, west], [north, east]],
+            # a transparência (IDW_OPACITY) já vem no canal alfa do PNG, o mesmo usado no PDF
+            opacity=1.0,
+            name=f"Superfície interpolada (IDW) - {variavel}",
+        ).add_to(m)
+
     bounds = []
 
     for p in pontos_mapa:
@@ -98,4 +88,13 @@ def render_map(df_filtrado, col_sel, variavel, pontos_sel):
     else:
         m.fit_bounds(bounds, padding=(30, 30))
 
+    return m
+
+
+def render_map(df_filtrado, col_sel, variavel, pontos_sel, superficie=None):
+    m = build_map(df_filtrado, col_sel, variavel, pontos_sel, superficie)
+    if m is None:
+        st.warning("Nenhum ponto disponível para exibir no mapa.")
+        return
+
     st.components.v1.html(m._repr_html_(), height=620, scrolling=False)
\ No newline at end of file
@@ -0,0 +1,625 @@
+import ctypes
+import gc
+import json
+import logging
+import multiprocessing
+import platform
+import shutil
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from functools import lru_cache, partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from PIL import Image
+
+import data_loader
+import dataset_store
+import map_export
+import report
+from anomalies import valid_readings
+from charts import build_reference_table, chart_co2, chart_means, chart_statistics
+from data_loader import build_statistics, filter_data, load_data
+from quality import build_quality_report
+from settings import (
+    PDF_RASTER_CHART_SCALE,
+    PERF_BASELINE_PATH,
+    PERF_CONFIRM_ATTEMPTS,
+    PERF_MEMORY_TOLERANCE,
+    PERF_MIN_MEMORY_DELTA_KB,
+    PERF_MIN_RSS_DELTA_KB,
+    PERF_MIN_TIME_DELTA_MS,
+    PERF_RSS_SAMPLE_SECONDS,
+    PERF_RSS_TOLERANCE,
+    PERF_TIME_TOLERANCE,
+    POINTS_COORDS,
+)
+
+# bases sintéticas fixas: mesma semente, mesmas leituras, em qualquer máquina;
+# com "arquivos", os dias são divididos em vários CSV lidos em paralelo
+SYNTHETIC_DATASETS = {
+    "pequena": {"dias": 3, "semente": 1},
+    "grande": {"dias": 30, "semente": 2},
+    "varios_arquivos": {"dias": 12, "semente": 3, "arquivos": 4},
+}
+# janela diária de medição (07:00 às 18:59, uma leitura por minuto em cada ponto)
+SYNTHETIC_DAY_MINUTES = (7 * 60, 19 * 60)
+SYNTHETIC_START = pd.Timestamp("2025-01-06")
+
+REFERENCE_TYPE = "Ambos"
+EXTERNAL_VALUES = {"temp": 22.0, "umid": 60.0, "co2": 400.0}
+VARIABLE = ("Temperatura (°C)", "Temperatura (°C)")
+
+OK = "ok"
+REGRESSION = "REGRESSÃO"
+NEW = "sem referência"
+NOT_MEASURED = "não medido"
+
+# etapas cuja memória fica quase toda fora do tracemalloc (Pillow, pyarrow, processos filhos)
+NATIVE_MEMORY_STAGES = ["load_data (fria)", "mapa estático", "generate_pdf", "build_report"]
+
+
+def synthetic_readings(dias: int, semente: int) -> pd.DataFrame:
+    rng = np.random.default_rng(semente)
+    minutos = np.arange(*SYNTHETIC_DAY_MINUTES)
+    instantes = SYNTHETIC_START + pd.to_timedelta(
+        np.repeat(np.arange(dias), len(minutos)) * 1440 + np.tile(minutos, dias), unit="min"
+    )
+    hora = (instantes.hour + instantes.minute / 60).to_numpy()
+    ciclo = np.sin((hora - 9) / 24 * 2 * np.pi)
+    n = len(instantes)
+
+    frames = []
+    for i, ponto in enumerate(POINTS_COORDS):
+        temp = 22 + 0.6 * i + 5 * ciclo + rng.normal(0, 0.3, n)
+        rh = 60 - 12 * ciclo + rng.normal(0, 1.5, n)
+        co2 = 430 + 60 * i + 80 * np.clip(ciclo, 0, None) + rng.normal(0, 15, n)
+        orvalho = temp - (100 - rh) / 5
+
+        # picos de sensor e leituras vazias exercitam a detecção de falhas e a saúde dos dados
+        temp[rng.random(n) < 0.002] = 85.0
+        co2[rng.random(n) < 0.001] = np.nan
+
+        frames.append(
+            pd.DataFrame(
+                {
+                    "Data-Hora": instantes.strftime("%d/%m/%Y"),
+                    "(Horário Padrão do Brasil)": instantes.strftime("%H:%M:%S"),
+                    "pontos": ponto,
+                    "Temperatura (°C)": temp,
+                    "RH (%)": rh,
+                    "CO2 (ppm)": co2,
+                    "Ponto de Orvalho (°C)": orvalho,
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def write_synthetic_dataset(nome: str, destino: Path) -> Path:
+    spec = SYNTHETIC_DATASETS[nome]
+    leituras = synthetic_readings(spec["dias"], spec["semente"])
+    # mesmo formato das exportações dos sensores: ';' e vírgula decimal
+    opcoes = {"sep": ";", "decimal": ",", "float_format": "%.1f", "index": False}
+    if "arquivos" not in spec:
+        path = Path(destino) / f"sintetica-{nome}.csv"
+        leituras.to_csv(path, **opcoes)
+        return path
+
+    # uma pasta com um arquivo por grupo de dias, como várias campanhas exportadas
+    pasta = Path(destino) / f"sintetica-{nome}"
+    pasta.mkdir()
+    dias = pd.to_datetime(leituras["Data-Hora"], format="%d/%m/%Y")
+    grupos = np.array_split(np.sort(dias.unique()), spec["arquivos"])
+    for i, grupo in enumerate(grupos, start=1):
+        leituras[dias.isin(grupo).to_numpy()].to_csv(pasta / f"campanha-{i}.csv", **opcoes)
+    return pasta
+
+
+@lru_cache(maxsize=16)
+def _fake_png(width: int, height: int) -> bytes:
+    # gradiente com grade: comprime como um tile ou gráfico real, e não como ruído
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = np.stack(
+        [200 + x * 40 // max(width, 1), 210 + y * 30 // max(height, 1), np.full_like(x, 225)],
+        axis=-1,
+    ).astype(np.uint8)
+    pixels[::32, :] = 170
+    pixels[:, ::32] = 170
+    buffer = BytesIO()
+    Image.fromarray(pixels, "RGB").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class _TileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        tile = _fake_png(map_export.TILE_SIZE, map_export.TILE_SIZE)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(tile)))
+        self.end_headers()
+        self.wfile.write(tile)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_tile_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TileHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _stub_write_image(fig, file, *args, scale=1, **kwargs):
+    # substitui o kaleido: grava um PNG do tamanho que a figura teria
+    largura = int((fig.layout.width or 700) * scale)
+    altura = int((fig.layout.height or 500) * scale)
+    Path(file).write_bytes(_fake_png(largura, altura))
+
+
+def _cold_start(ctx):
+    for pasta in ("cache", "dataset"):
+        shutil.rmtree(ctx["dir"] / pasta, ignore_errors=True)
+    data_loader._open_dataset.clear()
+    data_loader._load_files.clear()
+
+
+def _select_day(ctx):
+    df = ctx["df"]
+    ctx["data_sel"] = df["Data"].cat.categories[-1]
+    ctx["pontos_sel"] = sorted(df["pontos"].unique())
+
+
+def _prepare_aggregates(ctx):
+    ctx["agregado"] = valid_readings(ctx["filtrado"])
+
+
+def _prepare_pdf_assets(ctx):
+    map_export._compose_basemap.cache_clear()
+    ctx["graficos"] = report.export_plotly_figures(*ctx["figuras"], scale=PDF_RASTER_CHART_SCALE)
+    ctx["mapa"] = _export_map(ctx)
+    ctx["qualidade"] = build_quality_report(ctx["df"])
+
+
+def _load_cold(ctx):
+    ctx["df"] = load_data(ctx["fonte"])
+
+
+def _load_warm(ctx):
+    load_data(ctx["fonte"])
+
+
+def _filter(ctx):
+    ctx["filtrado"] = filter_data(ctx["df"], ctx["data_sel"], ctx["pontos_sel"], "Todos")
+
+
+def _statistics(ctx):
+    ctx["estat"] = build_statistics(ctx["agregado"], VARIABLE[0])
+
+
+def _plotly_charts(ctx):
+    agregado = ctx["agregado"]
+    ctx["tabela_ref"] = build_reference_table(**_external_kwargs())
+    chart_statistics(ctx["estat"], VARIABLE[1], ctx["data_sel"])
+    chart_co2(agregado, REFERENCE_TYPE, EXTERNAL_VALUES["co2"])
+    ctx["figuras"] = chart_means(agregado, REFERENCE_TYPE, **_external_kwargs())
+
+
+def _vector_charts(ctx):
+    largura = report.A4[0] - 144
+    report.build_vector_charts(
+        ctx["agregado"], REFERENCE_TYPE, **_external_kwargs(), width=largura, height=largura * 0.55
+    )
+
+
+def _export_map(ctx):
+    return map_export.export_static_map(
+        ctx["agregado"], ctx["pontos_sel"], VARIABLE[0], VARIABLE[1]
+    )
+
+
+def _static_map(ctx):
+    ctx["mapa"] = _export_map(ctx)
+
+
+def _generate_pdf(ctx):
+    report.generate_pdf(
+        ctx["tabela_ref"],
+        ctx["graficos"][1],
+        ctx["data_sel"],
+        ctx["pontos_sel"],
+        mapa_path=ctx["mapa"][1],
+        qualidade=ctx["qualidade"],
+    )
+
+
+def _build_report(ctx):
+    report.build_report(
+        *ctx["figuras"],
+        ctx["agregado"],
+        ctx["tabela_ref"],
+        ctx["data_sel"],
+        ctx["pontos_sel"],
+        VARIABLE[0],
+        VARIABLE[1],
+        ref_tipo=REFERENCE_TYPE,
+        **_external_kwargs(),
+        qualidade=ctx["qualidade"],
+    )
+
+
+def _external_kwargs():
+    return {
+        "ext_temp": EXTERNAL_VALUES["temp"],
+        "ext_ur": EXTERNAL_VALUES["umid"],
+        "ext_co2": EXTERNAL_VALUES["co2"],
+    }
+
+
+# (etapa, preparação fora da medição, etapa medida); cada uma usa o que as anteriores deixaram em ctx
+STAGES = [
+    ("load_data (fria)", _cold_start, _load_cold),
+    ("load_data (quente)", None, _load_warm),
+    ("filter_data", _select_day, _filter),
+    ("build_statistics", _prepare_aggregates, _statistics),
+    ("gráficos plotly", None, _plotly_charts),
+    ("gráficos vetoriais", None, _vector_charts),
+    ("mapa estático", lambda ctx: map_export._compose_basemap.cache_clear(), _static_map),
+    ("generate_pdf", _prepare_pdf_assets, _generate_pdf),
+    ("build_report", lambda ctx: map_export._compose_basemap.cache_clear(), _build_report),
+]
+
+
+def _status_kb(campo: str, pid="self") -> int | None:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as fh:
+            for linha in fh:
+                if linha.startswith(f"{campo}:"):
+                    return int(linha.split()[1])
+    except (OSError, ValueError):
+        return None
+    return None
+
+
+def _trim_malloc() -> None:
+    # devolve ao sistema o que etapas anteriores liberaram, para a etapa medida
+    # não crescer dentro de memória que já estava residente
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class _PeakRss:
+    # pico de memória residente de uma etapa, em KB, acima do que já estava residente.
+    # O do próprio processo vem do VmHWM do Linux, zerado antes da etapa. Nos processos
+    # filhos (workers do ProcessPool), conta o quanto o VmHWM de cada um passou da
+    # memória que ele tinha ao ser visto pela primeira vez (páginas herdadas no fork
+    # são compartilhadas); os filhos rodam juntos, então os picos são somados.
+    def __init__(self):
+        self.kb = None
+        self._filhos = {}
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, daemon=True)
+
+    def __enter__(self):
+        _trim_malloc()
+        try:
+            Path("/proc/self/clear_refs").write_text("5")
+        except OSError:
+            self._base = None
+            return self
+        self._base = _status_kb("VmRSS")
+        self._thread.start()
+        return self
+
+    def _amostrar_filhos(self):
+        for filho in multiprocessing.active_children():
+            pico = _status_kb("VmHWM", filho.pid)
+            if pico is None:
+                continue
+            if filho.pid not in self._filhos:
+                self._filhos[filho.pid] = [_status_kb("VmRSS", filho.pid) or pico, pico]
+            self._filhos[filho.pid][1] = max(pico, self._filhos[filho.pid][1])
+
+    def _amostrar(self):
+        while not self._parar.wait(PERF_RSS_SAMPLE_SECONDS):
+            self._amostrar_filhos()
+
+    def __exit__(self, *exc):
+        if self._base is None:
+            return False
+        self._parar.set()
+        self._thread.join()
+        self._amostrar_filhos()
+        pico = _status_kb("VmHWM")
+        if pico is not None:
+            filhos = sum(max(0, maximo - inicial) for inicial, maximo in self._filhos.values())
+            self.kb = max(0, pico - self._base) + filhos
+        return False
+
+
+def _measure(ctx, preparar, executar, repeticoes: int) -> dict:
+    # a primeira execução (imports tardios, caches internos das bibliotecas) fica de fora
+    tempos = []
+    for _ in range(repeticoes + 1):
+        if preparar:
+            preparar(ctx)
+        inicio = time.perf_counter()
+        executar(ctx)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos = tempos[1:]
+
+    # o tracemalloc deixa a execução mais lenta, então o pico é medido numa rodada à parte
+    if preparar:
+        preparar(ctx)
+    tracemalloc.start()
+    try:
+        executar(ctx)
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # o tracemalloc só vê alocações do Python: buffers do Pillow e do pyarrow e os
+    # processos filhos aparecem apenas na memória residente, medida sem ele ligado
+    if preparar:
+        preparar(ctx)
+    with _PeakRss() as rss:
+        executar(ctx)
+
+    # o menor tempo é o menos afetado por outros processos disputando a máquina;
+    # a distância até o maior é o ruído da própria etapa, usado como piso na comparação
+    return {
+        "tempo_ms": round(min(tempos), 2),
+        "ruido_ms": round(max(tempos) - min(tempos), 2),
+        "memoria_kb": round(pico / 1024, 1),
+        "rss_kb": rss.kb,
+    }
+
+
+def _best_of(medida: dict, nova: dict) -> dict:
+    melhor = nova if nova["tempo_ms"] < medida["tempo_ms"] else medida
+    rss = [m["rss_kb"] for m in (medida, nova) if m["rss_kb"] is not None]
+    return {
+        **melhor,
+        "memoria_kb": min(nova["memoria_kb"], medida["memoria_kb"]),
+        "rss_kb": min(rss) if rss else None,
+    }
+
+
+def run_dataset(nome: str, repeticoes: int, tile_url: str, suspeita=None, progress=print) -> dict:
+    with TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = tmp / "dataset"
+        ctx = {"dir": tmp, "fonte": write_synthetic_dataset(nome, tmp)}
+
+        # cache por arquivo, base Arrow, tiles e kaleido ficam isolados da instalação do app
+        with (
+            mock.patch.object(data_loader, "CACHE_DIR", tmp / "cache"),
+            mock.patch.object(data_loader, "read_stamp", partial(dataset_store.read_stamp, store_dir=store)),
+            mock.patch.object(data_loader, "write_dataset", partial(dataset_store.write_dataset, store_dir=store)),
+            mock.patch.object(data_loader, "open_dataset", partial(dataset_store.open_dataset, store_dir=store)),
+            mock.patch.object(data_loader, "build_lock", partial(dataset_store.build_lock, store_dir=store)),
+            mock.patch.object(map_export, "TILE_URL", tile_url),
+            mock.patch.object(report, "_configure_kaleido", lambda: None),
+            mock.patch.object(go.Figure, "write_image", _stub_write_image),
+        ):
+            resultados = {}
+            for etapa, preparar, executar in STAGES:
+                medida = _measure(ctx, preparar, executar, repeticoes)
+                # uma etapa acima da referência é medida de novo antes de contar como regressão:
+                # uma lentidão passageira da máquina some, uma regressão de verdade se repete
+                for tentativa in range(1, PERF_CONFIRM_ATTEMPTS + 1):
+                    if suspeita is None or not suspeita(nome, etapa, medida):
+                        break
+                    progress(f"  {nome} · {etapa}: acima da referência, medindo de novo ({tentativa}/{PERF_CONFIRM_ATTEMPTS})")
+                    medida = _best_of(medida, _measure(ctx, preparar, executar, repeticoes))
+                resultados[etapa] = medida
+                progress(f"  {nome} · {etapa}: {medida['tempo_ms']:.1f} ms")
+
+            _cold_start(ctx)
+            return {"linhas": len(ctx["df"]), "etapas": resultados}
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "plataforma": platform.platform(terse=True),
+        "processador": platform.machine(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+    }
+
+
+def load_baselines(path=PERF_BASELINE_PATH) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def save_baselines(atual: dict, repeticoes: int, path=PERF_BASELINE_PATH) -> None:
+    anterior = load_baselines(path) or {}
+    dados = {
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "ambiente": environment(),
+        "repeticoes": repeticoes,
+        # limites por etapa ajustados à mão são mantidos ao regravar as medições
+        "tolerancias": anterior.get("tolerancias", {}),
+        "bases": {**anterior.get("bases", {}), **atual},
+    }
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(dados, fh, ensure_ascii=False, indent=2)
+        fh.write("\n")
+
+
+def _check(atual, referencia, tolerancia, minimo):
+    if atual is None:
+        return NOT_MEASURED, None
+    if referencia is None:
+        return NEW, None
+    variacao = (atual - referencia) / referencia if referencia else 0.0
+    regrediu = atual > referencia * (1 + tolerancia) and atual - referencia > minimo
+    return (REGRESSION if regrediu else OK), variacao
+
+
+def _compare_stage(valores: dict, ref: dict, tol: dict, tol_tempo: float, tol_memoria: float, tol_rss: float):
+    # piso de ruído por etapa: o maior espalhamento entre as repetições da referência
+    # e da execução atual, nunca abaixo da resolução útil do cronômetro
+    piso = max(ref.get("ruido_ms", 0.0), valores["ruido_ms"], PERF_MIN_TIME_DELTA_MS)
+    status_t, var_t = _check(valores["tempo_ms"], ref.get("tempo_ms"), tol.get("tempo", tol_tempo), piso)
+    status_m, var_m = _check(
+        valores["memoria_kb"], ref.get("memoria_kb"), tol.get("memoria", tol_memoria), PERF_MIN_MEMORY_DELTA_KB
+    )
+    status_r, var_r = _check(
+        valores.get("rss_kb"), ref.get("rss_kb"), tol.get("rss", tol_rss), PERF_MIN_RSS_DELTA_KB
+    )
+    return (
+        (ref.get("tempo_ms"), valores["tempo_ms"], var_t, status_t),
+        (ref.get("memoria_kb"), valores["memoria_kb"], var_m, status_m),
+        (ref.get("rss_kb"), valores.get("rss_kb"), var_r, status_r),
+    )
+
+
+def _stage_reference(referencias: dict, base: str, etapa: str):
+    ref = referencias.get("bases", {}).get(base, {}).get("etapas", {}).get(etapa, {})
+    return ref, referencias.get("tolerancias", {}).get(etapa, {})
+
+
+def compare(atual: dict, referencias: dict, tol_tempo: float, tol_memoria: float, tol_rss: float) -> list[dict]:
+    linhas = []
+    for base, medida in atual.items():
+        for etapa, valores in medida["etapas"].items():
+            ref, tol = _stage_reference(referencias, base, etapa)
+            tempo, memoria, rss = _compare_stage(valores, ref, tol, tol_tempo, tol_memoria, tol_rss)
+            linhas.append({"base": base, "etapa": etapa, "tempo": tempo, "memoria": memoria, "rss": rss})
+    return linhas
+
+
+def regression_check(referencias: dict, tol_tempo: float, tol_memoria: float, tol_rss: float):
+    def suspeita(base, etapa, valores):
+        ref, tol = _stage_reference(referencias, base, etapa)
+        return any(m[3] == REGRESSION for m in _compare_stage(valores, ref, tol, tol_tempo, tol_memoria, tol_rss))
+
+    return suspeita
+
+
+def _format_cell(referencia, atual, variacao, status, unidade):
+    if atual is None:
+        return f"{'—':>10} → {'—':>10} {unidade}  {'':>9}  {status}"
+    if referencia is None:
+        return f"{'—':>10} → {atual:>10.1f} {unidade}  {'':>9}  {status}"
+    return f"{referencia:>10.1f} → {atual:>10.1f} {unidade}  {variacao:>+9.1%}  {status}"
+
+
+def format_report(linhas: list[dict]) -> str:
+    largura = max([len(l["etapa"]) for l in linhas] + [5])
+    saida = []
+    for base in dict.fromkeys(l["base"] for l in linhas):
+        saida.append(f"\nBase {base}")
+        saida.append(
+            f"  {'etapa':<{largura}}  {'tempo (referência → atual)':<50}  {'pico Python/tracemalloc':<50}  "
+            "pico residente/RSS com processos filhos"
+        )
+        for l in (l for l in linhas if l["base"] == base):
+            saida.append(
+                f"  {l['etapa']:<{largura}}  {_format_cell(*l['tempo'], 'ms'):<50}  "
+                f"{_format_cell(*l['memoria'], 'KB'):<50}  {_format_cell(*l['rss'], 'KB')}"
+            )
+
+    sem_rss = sorted({l["etapa"] for l in linhas if l["rss"][1] is None} & set(NATIVE_MEMORY_STAGES))
+    if sem_rss:
+        saida.append(
+            "\nMemória residente não medida nesta plataforma (requer /proc do Linux). "
+            "A verificação de memória destas etapas só cobre alocações do Python: " + ", ".join(sem_rss)
+        )
+    saida.append("O kaleido é substituído por um stub: a memória do Chromium não entra na medição.")
+    return "\n".join(saida)
+
+
+def regressions(linhas: list[dict]) -> list[str]:
+    falhas = []
+    for l in linhas:
+        for metrica, nome, unidade in (
+            ("tempo", "tempo", "ms"),
+            ("memoria", "memória Python", "KB"),
+            ("rss", "memória residente", "KB"),
+        ):
+            referencia, atual, variacao, status = l[metrica]
+            if status == REGRESSION:
+                falhas.append(
+                    f"{l['base']} · {l['etapa']}: {nome} {referencia:.1f} → {atual:.1f} {unidade} ({variacao:+.1%})"
+                )
+    return falhas
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Mede tempo e memória de pico de cada etapa do pipeline em bases sintéticas "
+        "e compara com as referências gravadas."
+    )
+    parser.add_argument("--bases", nargs="+", choices=list(SYNTHETIC_DATASETS), default=list(SYNTHETIC_DATASETS))
+    parser.add_argument("--repeticoes", type=int, default=5, help="execuções cronometradas por etapa (vale a menor)")
+    parser.add_argument("--tolerancia-tempo", type=float, default=PERF_TIME_TOLERANCE, help="piora relativa aceita no tempo")
+    parser.add_argument("--tolerancia-memoria", type=float, default=PERF_MEMORY_TOLERANCE, help="piora relativa aceita na memória")
+    parser.add_argument("--tolerancia-rss", type=float, default=PERF_RSS_TOLERANCE, help="piora relativa aceita na memória residente")
+    parser.add_argument("--referencia", type=Path, default=PERF_BASELINE_PATH, help="arquivo JSON com as referências")
+    parser.add_argument("--atualizar", action="store_true", help="grava as medições atuais como nova referência")
+    args = parser.parse_args()
+
+    # avisos de cache do Streamlit fora do app não interessam aqui
+    logging.disable(logging.WARNING)
+
+    referencias = None
+    suspeita = None
+    if not args.atualizar:
+        referencias = load_baselines(args.referencia)
+        if referencias is None:
+            print(f"Nenhuma referência em {args.referencia}; rode com --atualizar para criá-la.")
+            raise SystemExit(2)
+        suspeita = regression_check(referencias, args.tolerancia_tempo, args.tolerancia_memoria, args.tolerancia_rss)
+
+    server = start_tile_server()
+    tile_url = f"http://127.0.0.1:{server.server_address[1]}/{{z}}/{{x}}/{{y}}.png"
+    try:
+        atual = {}
+        for nome in args.bases:
+            print(f"Medindo base {nome}…")
+            atual[nome] = run_dataset(nome, args.repeticoes, tile_url, suspeita)
+    finally:
+        server.shutdown()
+
+    if args.atualizar:
+        save_baselines(atual, args.repeticoes, args.referencia)
+        print(f"Referências gravadas em {args.referencia}")
+        return
+
+    if referencias.get("ambiente") != environment():
+        print("Aviso: referências medidas em outro ambiente:", referencias.get("ambiente"))
+
+    linhas = compare(atual, referencias, args.tolerancia_tempo, args.tolerancia_memoria, args.tolerancia_rss)
+    print(format_report(linhas))
+
+    falhas = regressions(linhas)
+    if falhas:
+        print(f"\n{len(falhas)} regressão(ões) acima da tolerância:")
+        for falha in falhas:
+            print(f"  {falha}")
+        raise SystemExit(1)
+    print("\nNenhuma regressão acima da tolerância.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_loader import COERCED_COLUMN, COERCED_FIELDS, DUPLICATES_COLUMN
+from settings import GAP_MAX_MINUTES
+
+
+def value_counts(df: pd.DataFrame) -> pd.DataFrame:
+    bits = df[COERCED_COLUMN].to_numpy()
+    pontos = df["pontos"].to_numpy()
+
+    partes = []
+    for bit, coluna in enumerate(COERCED_FIELDS):
+        invalidos = (bits & (1 << bit)) > 0
+        ausentes = df[coluna].isna().to_numpy() & ~invalidos
+        partes.append(
+            pd.DataFrame({"Ponto": pontos, "Coluna": coluna, "Ausentes": ausentes, "Inválidos": invalidos})
+        )
+
+    contagem = pd.concat(partes, ignore_index=True).groupby(["Ponto", "Coluna"], sort=False).agg(
+        Leituras=("Ausentes", "size"),
+        Ausentes=("Ausentes", "sum"),
+        Inválidos=("Inválidos", "sum"),
+    )
+    return contagem.reset_index()
+
+
+def _intervals(df: pd.DataFrame) -> pd.DataFrame:
+    # intervalo entre leituras consecutivas do mesmo ponto, sem atravessar dias de campanha
+    validas = df.loc[df["DataHora"].notna(), ["pontos", "Data", "DataHora"]]
+    validas = validas.sort_values(["pontos", "DataHora"], kind="stable")
+    minutos = validas.groupby(["pontos", "Data"], observed=True, sort=False)["DataHora"].diff().dt.total_seconds() / 60
+    return validas.assign(minutos=minutos.to_numpy())
+
+
+def sampling_gaps(df: pd.DataFrame, intervalos: pd.DataFrame) -> pd.DataFrame:
+    lacuna = intervalos["minutos"] > GAP_MAX_MINUTES
+    intervalos = intervalos.assign(
+        lacuna=lacuna,
+        perdido=intervalos["minutos"].where(lacuna),
+    )
+    lacunas = intervalos.groupby("pontos", sort=True).agg(
+        Intervalo=("minutos", "median"),
+        Lacunas=("lacuna", "sum"),
+        Maior=("perdido", "max"),
+        Total=("perdido", "sum"),
+    )
+    duplicatas = df.groupby("pontos", sort=True)[DUPLICATES_COLUMN].sum()
+
+    lacunas = lacunas.join(duplicatas, how="outer").fillna(0).reset_index()
+    lacunas.columns = [
+        "Ponto",
+        "Intervalo típico (min)",
+        "Lacunas",
+        "Maior lacuna (min)",
+        "Tempo em lacunas (min)",
+        "Horários duplicados",
+    ]
+    return lacunas
+
+
+def daily_coverage(intervalos: pd.DataFrame) -> pd.DataFrame:
+    if intervalos.empty:
+        return pd.DataFrame(columns=["Data", "Ponto", "Leituras", "Início", "Fim", "Esperadas", "Cobertura"])
+
+    por_ponto = intervalos.groupby(["Data", "pontos"], observed=True, sort=True).agg(
+        Leituras=("DataHora", "size"),
+        Início=("DataHora", "min"),
+        Fim=("DataHora", "max"),
+    )
+    # cada ponto é medido numa janela própria do dia; a cobertura compara as leituras
+    # com as que caberiam nessa janela no intervalo típico do ponto
+    passo = intervalos.groupby("pontos")["minutos"].median().fillna(1.0).clip(lower=1 / 60)
+
+    por_ponto = por_ponto.reset_index()
+    duracao = (por_ponto["Fim"] - por_ponto["Início"]).dt.total_seconds() / 60
+    esperadas = np.floor(duracao / por_ponto["pontos"].map(passo).to_numpy()) + 1
+
+    por_ponto["Esperadas"] = esperadas.astype(int)
+    por_ponto["Cobertura"] = (por_ponto["Leituras"] / esperadas).clip(upper=1.0)
+    por_ponto["Início"] = por_ponto["Início"].dt.strftime("%H:%M:%S")
+    por_ponto["Fim"] = por_ponto["Fim"].dt.strftime("%H:%M:%S")
+    return por_ponto.rename(columns={"pontos": "Ponto"})
+
+
+def build_quality_report(df: pd.DataFrame) -> dict:
+    valores = value_counts(df)
+    # horários ilegíveis têm contagem própria e não entram de novo nos valores ilegíveis
+    horarios = valores["Coluna"] == "DataHora"
+    intervalos = _intervals(df)
+    lacunas = sampling_gaps(df, intervalos)
+    cobertura = daily_coverage(intervalos)
+
+    return {
+        "resumo": {
+            "leituras": int(len(df)),
+            "arquivos": int(df["Arquivo"].nunique()),
+            "horarios_invalidos": int(valores.loc[horarios, "Inválidos"].sum()),
+            "valores_invalidos": int(valores.loc[~horarios, "Inválidos"].sum()),
+            "valores_ausentes": int(valores["Ausentes"].sum()),
+            "lacunas": int(lacunas["Lacunas"].sum()),
+            "duplicados": int(lacunas["Horários duplicados"].sum()),
+            "cobertura_media": float(cobertura["Cobertura"].mean()) if len(cobertura) else 0.0,
+        },
+        "valores": valores,
+        "lacunas": lacunas,
+        "cobertura": cobertura,
+    }
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def data_quality(_df: pd.DataFrame, versao: str) -> dict:
+    # calculado uma vez por versão da base, junto com ela
+    return build_quality_report(_df)
@@ -0,0 +1,123 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from data_loader import source_version
+from settings import (
+    REFERENCE_DIR,
+    REFERENCE_TOLERANCE_MINUTES,
+    REFERENCE_UTC_OFFSET_HOURS,
+)
+
+# prefixos das colunas do CSV do INMET -> colunas de referência externa
+INMET_COLUMNS = {
+    "TEMPERATURA DO AR - BULBO SECO": "Temperatura Externa (°C)",
+    "UMIDADE RELATIVA DO AR, HORARIA": "RH Externa (%)",
+    "TEMPERATURA DO PONTO DE ORVALHO": "Ponto de Orvalho Externo (°C)",
+}
+
+# coluna interna -> (coluna externa, coluna da diferença interno − externo)
+DELTA_COLUMNS = {
+    "Temperatura (°C)": ("Temperatura Externa (°C)", "Δ Temperatura (°C)"),
+    "RH (%)": ("RH Externa (%)", "Δ RH (%)"),
+    "Ponto de Orvalho (°C)": ("Ponto de Orvalho Externo (°C)", "Δ Ponto de Orvalho (°C)"),
+}
+
+REFERENCE_ENCODING = "latin-1"
+MISSING_VALUE = -9999
+
+
+def list_reference_files(reference_dir=REFERENCE_DIR) -> list[Path]:
+    reference_dir = Path(reference_dir)
+    if not reference_dir.is_dir():
+        return []
+    return sorted(p for p in reference_dir.iterdir() if p.suffix.lower() == ".csv")
+
+
+def _header_row(path) -> int:
+    # o CSV do INMET começa com um bloco de metadados da estação (REGIAO:, UF:, ...)
+    with open(path, encoding=REFERENCE_ENCODING) as fh:
+        for i, linha in enumerate(fh):
+            linha = linha.upper()
+            if linha.startswith("DATA") and ";HORA" in linha:
+                return i
+            if i > 30:
+                break
+    raise ValueError(f"Cabeçalho do INMET não encontrado em {path.name}")
+
+
+def _parse_inmet_timestamps(data: pd.Series, hora: pd.Series) -> pd.Series:
+    dias = pd.to_datetime(data.astype(str).str.strip().str.replace("/", "-"), format="%Y-%m-%d", errors="coerce")
+    # "1300 UTC" nos arquivos recentes, "13:00" nos antigos
+    digitos = hora.astype(str).str.extract(r"(\d{1,2}):?(\d{2})")
+    horas = pd.to_timedelta(
+        pd.to_numeric(digitos[0], errors="coerce") * 60 + pd.to_numeric(digitos[1], errors="coerce"),
+        unit="min",
+    )
+    return dias + horas + pd.Timedelta(hours=REFERENCE_UTC_OFFSET_HOURS)
+
+
+def load_reference_series(path) -> pd.DataFrame:
+    raw = pd.read_csv(
+        path,
+        sep=";",
+        decimal=",",
+        encoding=REFERENCE_ENCODING,
+        skiprows=_header_row(path),
+        dtype=str,
+    )
+    raw.columns = raw.columns.astype(str).str.strip()
+    colunas = {c.upper(): c for c in raw.columns}
+
+    data_col = next((c for k, c in colunas.items() if k.startswith("DATA")), None)
+    hora_col = next((c for k, c in colunas.items() if k.startswith("HORA")), None)
+    if data_col is None or hora_col is None:
+        raise ValueError(f"Colunas de data/hora ausentes no CSV do INMET ({path.name})")
+
+    out = pd.DataFrame({"DataHora": _parse_inmet_timestamps(raw[data_col], raw[hora_col])})
+    for prefixo, destino in INMET_COLUMNS.items():
+        origem = next((c for k, c in colunas.items() if k.startswith(prefixo)), None)
+        if origem is None:
+            out[destino] = np.nan
+            continue
+        valores = pd.to_numeric(raw[origem].str.replace(",", ".", regex=False), errors="coerce")
+        out[destino] = valores.mask(valores <= MISSING_VALUE)
+
+    out = out.dropna(subset=["DataHora"])
+    return out.sort_values("DataHora").drop_duplicates("DataHora", keep="last").reset_index(drop=True)
+
+
+def join_reference(df: pd.DataFrame, referencia: pd.DataFrame) -> pd.DataFrame:
+    # cada leitura recebe a hora da estação mais próxima dentro da tolerância
+    validas = df["DataHora"].notna().to_numpy()
+    leituras = pd.DataFrame(
+        {"DataHora": df["DataHora"].to_numpy()[validas], "_pos": np.flatnonzero(validas)}
+    ).sort_values("DataHora", kind="stable")
+
+    juntado = pd.merge_asof(
+        leituras,
+        referencia,
+        on="DataHora",
+        direction="nearest",
+        tolerance=pd.Timedelta(minutes=REFERENCE_TOLERANCE_MINUTES),
+    )
+
+    out = pd.DataFrame(index=df.index)
+    for coluna, (externa, delta) in DELTA_COLUMNS.items():
+        valores = np.full(len(df), np.nan)
+        valores[juntado["_pos"].to_numpy()] = juntado[externa].to_numpy(dtype=float)
+        out[externa] = valores
+        out[delta] = df[coluna].to_numpy(dtype=float) - valores
+    return out
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _joined(_df: pd.DataFrame, versao_base: str, path: str, versao_ref: str) -> pd.DataFrame:
+    return join_reference(_df, load_reference_series(path))
+
+
+def reference_for(df: pd.DataFrame, versao_base: str, path) -> pd.DataFrame:
+    # o join da base inteira é refeito só quando a base ou o arquivo de referência mudam
+    return _joined(df, versao_base, str(path), source_version([path]))
@@ -1,9 +1,13 @@
+import threading
+import time
 from io import BytesIO
 from pathlib import Path
 from tempfile import TemporaryDirectory
 
 import plotly
 import plotly.io as pio
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.shapes import Drawing, Line, Rect, String
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet
@@ -17,6 +21,18 @@ from reportlab.platypus import (
     TableStyle,
 )
 
+from charts import MEAN_CHART_SPECS, external_references, mean_by_point
+from map_export import export_static_map
+from settings import (
+    INTERNAL_REFERENCES,
+    PDF_CHART_BACKEND,
+    PDF_DEFAULT_PROFILE,
+    PDF_RASTER_CHART_SCALE,
+)
+
+# o kaleido mantém um único subprocesso; exportações concorrentes são serializadas
+_kaleido_lock = threading.Lock()
+
 
 def _configure_kaleido():
     plotlyjs_path = (
@@ -31,7 +47,7 @@ def _configure_kaleido():
     pio.kaleido.scope.plotlyjs = plotlyjs_path.as_uri()
 
 
-def export_plotly_figures(fig_temp, fig_umid, fig_co2):
+def export_plotly_figures(fig_temp, fig_umid, fig_co2, scale=2):
     _configure_kaleido()
 
     temp_dir = TemporaryDirectory()
@@ -41,9 +57,10 @@ def export_plotly_figures(fig_temp, fig_umid, fig_co2):
     umid_path = base / "umid.png"
     co2_path = base / "co2.png"
 
-    fig_temp.write_image(str(temp_path), format="png", engine="kaleido", scale=2)
-    fig_umid.write_image(str(umid_path), format="png", engine="kaleido", scale=2)
-    fig_co2.write_image(str(co2_path), format="png", engine="kaleido", scale=2)
+    with _kaleido_lock:
+        fig_temp.write_image(str(temp_path), format="png", engine="kaleido", scale=scale)
+        fig_umid.write_image(str(umid_path), format="png", engine="kaleido", scale=scale)
+        fig_co2.write_image(str(co2_path), format="png", engine="kaleido", scale=scale)
 
     return temp_dir, {
         "temp": temp_path,
@@ -52,7 +69,96 @@ def export_plotly_figures(fig_temp, fig_umid, fig_co2):
     }
 
 
-def generate_pdf(tabela_ref_df, png_paths, data_sel, pontos_sel, mapa_path=None):
+def _reference_lines(ref_tipo, ref_int, ref_ext, nome_int, nome_ext):
+    linhas = []
+    if ref_tipo in ("Interno (ABNT/ANVISA)", "Ambos"):
+        linhas.append((ref_int, nome_int, colors.green, (6, 3)))
+    if ref_tipo in ("Externo (INMET/Referência)", "Ambos"):
+        linhas.append((ref_ext, nome_ext, colors.gray, (1, 2)))
+    return linhas
+
+
+def build_vector_chart(df_mean, spec, ref_tipo, ref_ext, width, height) -> Drawing:
+    drawing = Drawing(width, height)
+    pontos = df_mean["pontos"].astype(str).tolist()
+    valores = [0.0 if v != v else float(v) for v in df_mean[spec["coluna"]]]
+
+    linhas = _reference_lines(
+        ref_tipo,
+        INTERNAL_REFERENCES[spec["key"]],
+        ref_ext,
+        spec["nome_int"],
+        spec["nome_ext"].format(ref_ext),
+    )
+
+    topo = max(valores + [v for v, *_ in linhas] + [1.0]) * 1.12
+    legenda_h = 16
+
+    chart = VerticalBarChart()
+    chart.x = 46
+    chart.y = 28
+    chart.width = width - chart.x - 12
+    chart.height = height - chart.y - 26 - legenda_h
+    chart.data = [valores]
+    chart.categoryAxis.categoryNames = pontos
+    chart.categoryAxis.labels.fontName = "Helvetica"
+    chart.categoryAxis.labels.fontSize = 8
+    chart.valueAxis.valueMin = 0
+    chart.valueAxis.valueMax = topo
+    chart.valueAxis.labels.fontName = "Helvetica"
+    chart.valueAxis.labels.fontSize = 8
+    chart.valueAxis.visibleGrid = True
+    chart.valueAxis.gridStrokeColor = colors.HexColor("#e5e5e5")
+    chart.bars[0].fillColor = colors.toColor(spec["cor"])
+    chart.bars[0].strokeColor = None
+    chart.barSpacing = 4
+    drawing.add(chart)
+
+    drawing.add(String(chart.x, height - 14, spec["titulo"], fontName="Helvetica-Bold", fontSize=10))
+    drawing.add(String(8, chart.y + chart.height / 2, spec["unidade"], fontName="Helvetica", fontSize=8))
+
+    for valor, _, cor, dash in linhas:
+        y = chart.y + chart.height * valor / topo
+        drawing.add(
+            Line(chart.x, y, chart.x + chart.width, y, strokeColor=cor, strokeWidth=1.8, strokeDashArray=dash)
+        )
+
+    # legenda na mesma ordem das séries do gráfico interativo
+    itens = [(spec["nome"], chart.bars[0].fillColor, None)] + [
+        (nome, cor, dash) for _, nome, cor, dash in linhas
+    ]
+    x = chart.x
+    y = height - 14 - legenda_h
+    for nome, cor, dash in itens:
+        if dash is None:
+            drawing.add(Rect(x, y, 10, 7, fillColor=cor, strokeColor=None))
+        else:
+            drawing.add(Line(x, y + 3.5, x + 14, y + 3.5, strokeColor=cor, strokeWidth=1.8, strokeDashArray=dash))
+        drawing.add(String(x + 18, y, nome, fontName="Helvetica", fontSize=8))
+        x += 26 + len(nome) * 4.4
+
+    return drawing
+
+
+def build_vector_charts(df_filtrado, ref_tipo, ext_temp, ext_ur, ext_co2, width, height):
+    df_mean = mean_by_point(df_filtrado)
+    ext = external_references(ext_temp, ext_ur, ext_co2)
+    return {
+        spec["key"]: build_vector_chart(df_mean, spec, ref_tipo, ext[spec["key"]], width, height)
+        for spec in MEAN_CHART_SPECS
+    }
+
+
+def generate_pdf(
+    tabela_ref_df,
+    png_paths,
+    data_sel,
+    pontos_sel,
+    mapa_path=None,
+    charts=None,
+    qualidade=None,
+):
+    # o perfil de saída age nas imagens (mapa e gráficos) preparadas antes daqui
     buffer = BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=A4)
     styles = getSampleStyleSheet()
@@ -84,13 +190,19 @@ def generate_pdf(tabela_ref_df, png_paths, data_sel, pontos_sel, mapa_path=None)
     story.append(Spacer(1, 12))
 
     story.append(Paragraph("Gráficos comparativos", styles["Heading2"]))
+    charts = charts or {}
+    png_paths = png_paths or {}
     for titulo, key in [
         ("Temperatura Média vs Referências", "temp"),
         ("Umidade Relativa Média vs Referências", "umid"),
         ("CO₂ Médio vs Referências", "co2"),
     ]:
         path = png_paths.get(key)
-        if path and path.exists():
+        if key in charts:
+            story.append(Paragraph(titulo, styles["Heading3"]))
+            story.append(charts[key])
+            story.append(Spacer(1, 8))
+        elif path and path.exists():
             story.append(Paragraph(titulo, styles["Heading3"]))
             story.append(RLImage(str(path), width=W - 72, height=(W - 72) * 0.55))
             story.append(Spacer(1, 8))
@@ -101,6 +213,157 @@ def generate_pdf(tabela_ref_df, png_paths, data_sel, pontos_sel, mapa_path=None)
         story.append(Spacer(1, 8))
         story.append(RLImage(str(mapa_path), width=W - 72, height=(W - 72) * 0.65))
 
+    if qualidade is not None:
+        story.extend(_quality_section(qualidade, data_sel, pontos_sel, styles, W))
+
     doc.build(story)
     buffer.seek(0)
-    return buffer
\ No newline at end of file
+    return buffer
+
+
+def _quality_section(qualidade, data_sel, pontos_sel, styles, W):
+    resumo = qualidade["resumo"]
+    story = [
+        Spacer(1, 12),
+        Paragraph("Qualidade dos dados", styles["Heading2"]),
+        Paragraph(
+            f"Base com {resumo['leituras']} leituras em {resumo['arquivos']} arquivo(s): "
+            f"{resumo['horarios_invalidos']} horário(s) ilegível(is), "
+            f"{resumo['valores_invalidos']} valor(es) ilegível(is), "
+            f"{resumo['valores_ausentes']} valor(es) ausente(s), "
+            f"{resumo['lacunas']} lacuna(s) de amostragem e "
+            f"{resumo['duplicados']} horário(s) duplicado(s).",
+            styles["Normal"],
+        ),
+        Spacer(1, 8),
+    ]
+
+    cobertura = qualidade["cobertura"]
+    cobertura = cobertura[(cobertura["Data"] == data_sel) & cobertura["Ponto"].isin(pontos_sel)]
+    if len(cobertura):
+        linhas = [["Ponto", "Leituras", "Início", "Fim", "Esperadas", "Cobertura"]] + [
+            [r.Ponto, r.Leituras, r.Início, r.Fim, r.Esperadas, f"{r.Cobertura:.0%}"]
+            for r in cobertura.itertuples(index=False)
+        ]
+        story.append(Paragraph(f"Cobertura em {data_sel}", styles["Heading3"]))
+        story.append(_styled_table(linhas, [(W - 144) / 6] * 6))
+        story.append(Spacer(1, 8))
+
+    lacunas = qualidade["lacunas"]
+    lacunas = lacunas[lacunas["Ponto"].isin(pontos_sel)]
+    if len(lacunas):
+        linhas = [["Ponto", "Intervalo (min)", "Lacunas", "Maior (min)", "Duplicados"]] + [
+            [r[0], f"{r[1]:.1f}", int(r[2]), f"{r[3]:.1f}", int(r[5])]
+            for r in lacunas.itertuples(index=False)
+        ]
+        story.append(Paragraph("Lacunas e duplicidades por ponto (base inteira)", styles["Heading3"]))
+        story.append(_styled_table(linhas, [(W - 144) / 5] * 5))
+    return story
+
+
+def _styled_table(linhas, col_widths):
+    tbl = RLTable(linhas, repeatRows=1, colWidths=col_widths)
+    tbl.setStyle(
+        TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                ("FONTSIZE", (0, 0), (-1, -1), 8),
+                ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.grey),
+                ("BOX", (0, 0), (-1, -1), 0.5, colors.grey),
+            ]
+        )
+    )
+    return tbl
+
+
+def _no_progress(stage, fraction):
+    pass
+
+
+def build_report(
+    fig_temp,
+    fig_umid,
+    fig_co2,
+    df_filtrado,
+    tabela_ref_df,
+    data_sel,
+    pontos_sel,
+    col_sel,
+    variavel,
+    ref_tipo=None,
+    ext_temp=None,
+    ext_ur=None,
+    ext_co2=None,
+    superficie=None,
+    chart_backend=PDF_CHART_BACKEND,
+    profile=PDF_DEFAULT_PROFILE,
+    qualidade=None,
+    stats=None,
+    progress=None,
+) -> bytes:
+    progress = progress or _no_progress
+    stats = {} if stats is None else stats
+    inicio = time.perf_counter()
+    temp_dir_graficos = None
+    temp_dir_mapa = None
+    png_paths = {}
+    charts = None
+
+    try:
+        if chart_backend == "vector":
+            progress("Desenhando gráficos", 0.05)
+            # largura útil da página com as margens padrão do SimpleDocTemplate
+            largura = A4[0] - 144
+            charts = build_vector_charts(
+                df_filtrado,
+                ref_tipo,
+                ext_temp,
+                ext_ur,
+                ext_co2,
+                width=largura,
+                height=largura * 0.55,
+            )
+        else:
+            progress("Exportando gráficos", 0.05)
+            temp_dir_graficos, png_paths = export_plotly_figures(
+                fig_temp=fig_temp,
+                fig_umid=fig_umid,
+                fig_co2=fig_co2,
+                scale=PDF_RASTER_CHART_SCALE,
+            )
+
+        progress("Gerando mapa", 0.45)
+        temp_dir_mapa, mapa_path = export_static_map(
+            df_filtrado=df_filtrado,
+            pontos_sel=pontos_sel,
+            col_sel=col_sel,
+            variavel=variavel,
+            superficie=superficie,
+            profile=profile,
+        )
+        stats["mapa_bytes"] = Path(mapa_path).stat().st_size
+
+        progress("Montando PDF", 0.8)
+        pdf_buffer = generate_pdf(
+            tabela_ref_df=tabela_ref_df,
+            png_paths=png_paths,
+            data_sel=data_sel,
+            pontos_sel=pontos_sel,
+            mapa_path=mapa_path,
+            charts=charts,
+            qualidade=qualidade,
+        )
+        pdf = pdf_buffer.getvalue()
+        stats.update(
+            perfil=profile,
+            pdf_bytes=len(pdf),
+            segundos=time.perf_counter() - inicio,
+        )
+        return pdf
+
+    finally:
+        if temp_dir_graficos is not None:
+            temp_dir_graficos.cleanup()
+        if temp_dir_mapa is not None:
+            temp_dir_mapa.cleanup()
@@ -35,14 +35,20 @@ def classificar_co2(co2):
     return "Risco"
 
 
+# cor de fundo e do texto de cada classificação
+CORES_CLASSIFICACAO = {
+    "Baixa": ("blue", "white"),
+    "Muito Baixa": ("blue", "white"),
+    "Ideal": ("green", "white"),
+    "Alta": ("orange", "black"),
+    "Risco": ("red", "white"),
+    "Aceitável": ("#ffcc00", "black"),
+    "N/D": ("#999999", "white"),
+}
+
+
 def cor_classificacao(val):
-    cores = {
-        "Baixa": "background-color: blue; color: white",
-        "Muito Baixa": "background-color: blue; color: white",
-        "Ideal": "background-color: green; color: white",
-        "Alta": "background-color: orange; color: black",
-        "Risco": "background-color: red; color: white",
-        "Aceitável": "background-color: #ffcc00; color: black",
-        "N/D": "background-color: #999999; color: white",
-    }
-    return cores.get(val, "")
\ No newline at end of file
+    if val not in CORES_CLASSIFICACAO:
+        return ""
+    fundo, texto = CORES_CLASSIFICACAO[val]
+    return f"background-color: {fundo}; color: {texto}"
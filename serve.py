@@ -0,0 +1,32 @@
+import argparse
+import logging
+import sys
+
+from streamlit.web import cli
+
+from settings import BASE_DIR, WARMUP_READY_HOST, WARMUP_READY_PORT
+from warmup import serve_readiness, start_warm_up
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Sobe o app Streamlit já aquecendo os caches, com uma sonda de prontidão."
+    )
+    parser.add_argument("--host-prontidao", default=WARMUP_READY_HOST)
+    parser.add_argument("--porta-prontidao", type=int, default=WARMUP_READY_PORT)
+    args, streamlit_args = parser.parse_known_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    # o aquecimento roda no mesmo processo do servidor, então os caches que ele
+    # preenche são os mesmos que as sessões usam; começa assim que o runtime existe
+    serve_readiness(args.host_prontidao, args.porta_prontidao)
+    start_warm_up(aguardar_runtime=True)
+    print(f"Prontidão em http://{args.host_prontidao}:{args.porta_prontidao}/")
+
+    sys.argv = ["streamlit", "run", str(BASE_DIR / "app.py"), *streamlit_args]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,23 @@ DATA_DIR = BASE_DIR / "data"
 ASSETS_DIR = BASE_DIR / "assets"
 
 EXCEL_PATH = DATA_DIR / "Base de dados.xlsx"
+# arquivo, pasta ou padrão glob (ex.: DATA_DIR / "campanhas" / "*.xlsx")
+DATA_SOURCE = EXCEL_PATH
+CACHE_DIR = BASE_DIR / ".cache"
+# base consolidada em Arrow IPC, mapeada em memória por todos os processos do app
+DATASET_STORE_DIR = CACHE_DIR / "dataset"
+DATASET_STORE_KEEP = 2
+# processos usados para ler vários arquivos em paralelo (None = nº de CPUs)
+INGEST_WORKERS = None
+# linhas lidas por bloco nas planilhas grandes
+INGEST_CHUNK_ROWS = 50_000
 ICON_PATH = ASSETS_DIR / "icone_ponto.png"
+# exportações horárias de estações do INMET (CSV) usadas como referência externa
+REFERENCE_DIR = DATA_DIR / "referencias"
+# distância máxima entre a leitura e a hora da estação no join as-of
+REFERENCE_TOLERANCE_MINUTES = 90
+# horário do INMET é UTC; as leituras estão no Horário Padrão de Brasília
+REFERENCE_UTC_OFFSET_HOURS = -3
 
 APP_TITLE = "Análise da Qualidade do Ar - Santa Luzia (DF)"
 PAGE_TITLE = "Análise da Qualidade do Ar - Santa Luzia"
@@ -28,4 +44,120 @@ INTERNAL_REFERENCES = {
     "temp": 23.0,
     "umid": 52.5,
     "co2": 450.0,
-}
\ No newline at end of file
+}
+
+# Detecção de falhas de sensor na ingestão
+SENSOR_LIMITS = {
+    "Temperatura (°C)": (-10.0, 60.0),
+    "RH (%)": (0.0, 100.0),
+    "CO2 (ppm)": (250.0, 10000.0),
+    "Ponto de Orvalho (°C)": (-40.0, 50.0),
+}
+
+# variação máxima aceitável por minuto entre leituras consecutivas
+SENSOR_MAX_RATE = {
+    "Temperatura (°C)": 8.0,
+    "RH (%)": 15.0,
+    "CO2 (ppm)": 800.0,
+    "Ponto de Orvalho (°C)": 5.0,
+}
+
+# leituras idênticas consecutivas a partir das quais o sensor é considerado travado
+FLATLINE_MIN_RUN = 15
+# intervalo máximo entre leituras de um mesmo ponto antes de marcar lacuna
+GAP_MAX_MINUTES = 5.0
+
+
+# Mapa ao vivo: intervalo entre atualizações dos valores dos pontos
+LIVE_MAP_REFRESH_SECONDS = 10.0
+LIVE_MAP_HEIGHT = 620
+
+
+# Superfície interpolada (IDW) entre os pontos de coleta
+IDW_POWER = 2.0
+# margem em torno da área dos pontos, em fração da extensão
+IDW_MARGIN = 0.25
+IDW_OPACITY = 0.55
+# tempo máximo de recálculo da grade; a resolução é ajustada para caber nele
+IDW_BUDGET_MS = 100.0
+IDW_GRID_MIN = 48
+IDW_GRID_MAX = 320
+
+# Fila de geração de relatórios em segundo plano
+REPORT_MAX_WORKERS = 2
+# relatórios concluídos mantidos em memória para download
+REPORT_JOBS_RETAINED = 32
+
+# API JSON local (api.py)
+API_HOST = "127.0.0.1"
+API_PORT = 8502
+# intervalo mínimo, em segundos, entre verificações de mudança nos arquivos de dados
+API_VERSION_CHECK_SECONDS = 2.0
+
+# Aquecimento do app iniciado por serve.py, antes da primeira sessão
+# porta da sonda de prontidão do app (503 enquanto aquece, 200 quando pronto)
+WARMUP_READY_HOST = "0.0.0.0"
+WARMUP_READY_PORT = 8503
+# tempo máximo de espera pelo runtime do Streamlit antes de aquecer
+WARMUP_RUNTIME_TIMEOUT_SECONDS = 60.0
+
+# Exportação das leituras filtradas (CSV/Parquet)
+EXPORT_CHUNK_ROWS = 20_000
+# o download pelo painel monta o arquivo inteiro em memória; acima deste limite
+# só o link da API (que envia em partes) é oferecido
+EXPORT_DASHBOARD_MAX_ROWS = 200_000
+# endereço da API visto pelo navegador de quem usa o painel
+EXPORT_API_URL = f"http://{API_HOST}:{API_PORT}"
+
+# Gráficos do PDF: "vector" desenha direto no ReportLab; "kaleido" exporta PNG pelo Plotly
+PDF_CHART_BACKEND = "vector"
+# escala dos PNG do backend "kaleido"; os gráficos vetoriais não dependem de resolução
+PDF_RASTER_CHART_SCALE = 2
+
+# Perfis de saída do PDF: mudam só a imagem do mapa exportado
+PDF_PROFILES = {
+    "screen": {
+        "descricao": "Tela / e-mail (menor arquivo)",
+        "map_scale": 0.75,
+        "map_format": "JPEG",
+        "jpeg_quality": 72,
+        "palette_colors": None,
+    },
+    "print": {
+        "descricao": "Impressão",
+        "map_scale": 1.0,
+        "map_format": "PNG",
+        "jpeg_quality": None,
+        "palette_colors": 256,
+    },
+    "archive": {
+        "descricao": "Arquivo (sem perdas)",
+        "map_scale": 1.0,
+        "map_format": "PNG",
+        "jpeg_quality": None,
+        "palette_colors": None,
+    },
+}
+PDF_DEFAULT_PROFILE = "print"
+# bases cartográficas montadas mantidas em memória por processo; cada uma é uma
+# imagem RGBA do tamanho do mapa (≈ 3,8 MB em 1200×800)
+MAP_BASEMAP_CACHE_SIZE = 4
+
+# Verificação de regressão de desempenho (perf_regression.py)
+PERF_BASELINE_PATH = BASE_DIR / "perf_baselines.json"
+# quanto cada etapa pode piorar em relação à referência gravada (0.50 = 50%);
+# o tempo oscila bem mais que a memória entre execuções na mesma máquina
+PERF_TIME_TOLERANCE = 0.50
+PERF_MEMORY_TOLERANCE = 0.20
+# a memória residente depende do reaproveitamento de páginas pelo alocador e varia
+# de 10 a 20% entre execuções; o limite só precisa pegar buffers inteiros a mais
+PERF_RSS_TOLERANCE = 0.50
+# pisos absolutos de ruído; no tempo vale o maior entre este valor e o espalhamento
+# das repetições de cada etapa, gravado junto com a referência
+PERF_MIN_TIME_DELTA_MS = 1.0
+PERF_MIN_MEMORY_DELTA_KB = 16
+PERF_MIN_RSS_DELTA_KB = 4096
+# intervalo de amostragem da memória residente dos processos filhos (ProcessPool)
+PERF_RSS_SAMPLE_SECONDS = 0.005
+# novas medições de uma etapa acima da referência antes de acusar regressão
+PERF_CONFIRM_ATTEMPTS = 2
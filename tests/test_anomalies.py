@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from anomalies import FAULT_COLUMN, GAP_COLUMN, REASON_COLUMN, SensorFaultDetector, flag_anomalies
+
+
+def _leituras(pontos, inicio, minutos, co2):
+    horarios = pd.Timestamp(inicio) + pd.to_timedelta(minutos, unit="min")
+    return pd.DataFrame(
+        {
+            "pontos": pontos,
+            "DataHora": horarios,
+            "Temperatura (°C)": 25.0 + np.arange(len(minutos)) * 0.1,
+            "RH (%)": 50.0 + np.arange(len(minutos)) % 3,
+            "CO2 (ppm)": co2,
+            "Ponto de Orvalho (°C)": 14.0 + np.arange(len(minutos)) % 2,
+        }
+    )
+
+
+def test_deteccao_em_blocos_igual_a_de_uma_vez():
+    rng = np.random.default_rng(7)
+    frames = []
+    for ponto in ("Ponto 1", "Ponto 2"):
+        for dia in ("2025-04-20 08:00", "2025-04-21 08:00"):
+            minutos = np.cumsum(rng.choice([1, 1, 1, 9], size=40))
+            co2 = rng.normal(450, 20, size=40).round()
+            co2[5:25] = 500.0  # sensor travado
+            co2[30] = 9000.0  # salto
+            co2[35] = 40000.0  # fora da faixa
+            frames.append(_leituras(ponto, dia, minutos, co2))
+    # chegada em ordem cronológica, com os pontos intercalados
+    df = pd.concat(frames).sort_values("DataHora", kind="stable").reset_index(drop=True)
+
+    inteiro = flag_anomalies(df)
+
+    detector = SensorFaultDetector()
+    em_blocos = pd.concat(
+        [flag_anomalies(df.iloc[i : i + 13], detector) for i in range(0, len(df), 13)]
+    )
+
+    colunas = [FAULT_COLUMN, REASON_COLUMN, GAP_COLUMN]
+    assert_frame_equal(em_blocos[colunas], inteiro[colunas])
+    assert inteiro[FAULT_COLUMN].any() and inteiro[GAP_COLUMN].any()
+
+
+def test_nova_campanha_comeca_serie_nova():
+    co2 = np.full(12, 500.0)
+    primeiro = _leituras("Ponto 1", "2025-04-20 08:00", np.arange(12), co2)
+    # semanas depois o sensor volta com o mesmo valor: 12 + 5 repetições não são uma
+    # sequência travada, porque cada campanha começa uma série nova
+    segundo = _leituras("Ponto 1", "2025-05-22 08:00", np.arange(5), np.full(5, 500.0))
+    repetido = _leituras("Ponto 1", "2025-07-18 08:00", np.arange(5), np.full(5, 3000.0))
+
+    for lotes in ([pd.concat([primeiro, segundo, repetido], ignore_index=True)], [primeiro, segundo, repetido]):
+        detector = SensorFaultDetector(flatline_min_run=15)
+        marcado = pd.concat([flag_anomalies(lote, detector) for lote in lotes], ignore_index=True)
+
+        assert not marcado[GAP_COLUMN].any()
+        assert not marcado[FAULT_COLUMN].any()
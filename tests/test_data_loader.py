@@ -0,0 +1,46 @@
+from pathlib import Path
+
+import numpy as np
+
+import data_loader
+from data_loader import COERCED_FIELDS, _parse_file
+
+HEADER = "Data-Hora;(Horário Padrão do Brasil);pontos;Temperatura (°C);RH (%);CO2 (ppm);Ponto de Orvalho (°C)\n"
+
+
+def test_csv_com_virgula_decimal_perde_apenas_a_celula_ilegivel(tmp_path: Path):
+    path = tmp_path / "sensor.csv"
+    path.write_text(
+        HEADER
+        + "20/04/2025;10:00:00;Ponto 1;25,0;50,5;420;14,1\n"
+        + "20/04/2025;10:01:00;Ponto 1;abc;50,5;420;14,1\n"
+        + "20/04/2025;10:02:00;Ponto 1;25,2;50,5;420;14,1\n"
+        + "20/04/2025;10:03:00;Ponto 1;25,3;50,5;420;14,1\n",
+        encoding="utf-8",
+    )
+
+    df = _parse_file(path)
+
+    np.testing.assert_array_equal(df["Temperatura (°C)"].to_numpy(), [25.0, np.nan, 25.2, 25.3])
+    np.testing.assert_array_equal(df["RH (%)"].to_numpy(), [50.5] * 4)
+    bit_temp = 1 << COERCED_FIELDS.index("Temperatura (°C)")
+    assert ((df["Coagidos"] & bit_temp) > 0).tolist() == [False, True, False, False]
+
+
+def test_cache_guarda_so_a_geracao_atual_de_cada_arquivo(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(data_loader, "CACHE_DIR", tmp_path / "cache")
+    linha = "20/04/2025;10:00:00;Ponto 1;25,0;50,5;420;14,1\n"
+    path = tmp_path / "sensor.csv"
+    # mesmo nome em outra pasta: é outro arquivo e o cache dele fica
+    vizinho = tmp_path / "outra" / "sensor.csv"
+    vizinho.parent.mkdir()
+    vizinho.write_text(HEADER + linha, encoding="utf-8")
+    data_loader._read_file_cached(str(vizinho))
+
+    for linhas in (1, 2, 3):
+        path.write_text(HEADER + linha * linhas, encoding="utf-8")
+        assert len(data_loader._read_file_cached(str(path))) == linhas
+
+    caches = list((tmp_path / "cache").glob("*.pkl"))
+    assert len(caches) == 2
+    assert data_loader._cache_prefix(vizinho) != data_loader._cache_prefix(path)
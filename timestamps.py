@@ -0,0 +1,141 @@
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+
+DATE_FORMATS = (
+    "%Y-%m-%d",
+    "%d/%m/%Y",
+    "%Y-%m-%d %H:%M:%S",
+    "%d/%m/%Y %H:%M:%S",
+)
+
+TIME_FORMATS = (
+    "%H:%M:%S",
+    "%H:%M",
+    "%H:%M:%S.%f",
+)
+
+DATETIME_FORMATS = (
+    "%Y-%m-%dT%H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%d/%m/%Y %H:%M:%S",
+    "%d/%m/%Y %H:%M",
+)
+
+# origem das datas seriais do Excel (sistema 1900)
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+
+
+def _strings_with_formats(values: pd.Series, formats) -> pd.Series:
+    result = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    pending = values.notna()
+    for fmt in formats:
+        if not pending.any():
+            break
+        parsed = pd.to_datetime(values[pending], format=fmt, errors="coerce")
+        result[parsed.index] = parsed
+        pending &= result.isna()
+
+    # fallback para formatos inesperados: inferência elemento a elemento,
+    # restrita aos poucos valores únicos que não casaram com nenhum formato
+    if pending.any():
+        result[pending] = pd.to_datetime(values[pending], format="mixed", errors="coerce")
+    return result
+
+
+def _parse_unique_datetimes(uniques: pd.Series, formats) -> pd.Series:
+    result = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[ns]")
+
+    native = uniques.map(lambda v: isinstance(v, (datetime, date, np.datetime64)))
+    if native.any():
+        result[native] = pd.to_datetime(uniques[native].tolist(), errors="coerce")
+
+    serial = uniques.map(lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, bool))
+    if serial.any():
+        result[serial] = EXCEL_EPOCH + pd.to_timedelta(
+            pd.to_numeric(uniques[serial], errors="coerce"), unit="D"
+        )
+
+    text = ~(native | serial) & uniques.notna()
+    if text.any():
+        result[text] = _strings_with_formats(uniques[text].astype(str).str.strip(), formats)
+    return result
+
+
+def _parse_unique_times(uniques: pd.Series) -> pd.Series:
+    result = pd.Series(pd.NaT, index=uniques.index, dtype="timedelta64[ns]")
+
+    native = uniques.map(lambda v: isinstance(v, (time, datetime)))
+    if native.any():
+        result[native] = pd.to_timedelta(
+            [
+                v.hour * 3600 + v.minute * 60 + v.second + v.microsecond / 1e6
+                for v in uniques[native]
+            ],
+            unit="s",
+        )
+
+    serial = uniques.map(lambda v: isinstance(v, (int, float, np.number)) and not isinstance(v, bool))
+    if serial.any():
+        # fração do dia, como o Excel armazena horários
+        fraction = pd.to_numeric(uniques[serial], errors="coerce") % 1
+        result[serial] = pd.to_timedelta((fraction * 86400).round(), unit="s")
+
+    text = ~(native | serial) & uniques.notna()
+    if text.any():
+        parsed = _strings_with_formats(uniques[text].astype(str).str.strip(), TIME_FORMATS)
+        result[text] = parsed - parsed.dt.normalize()
+    return result
+
+
+def _broadcast(values: pd.Series, parse_uniques) -> pd.Series:
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    if len(uniques) == 0:
+        return pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    parsed = parse_uniques(pd.Series(uniques, dtype=object))
+    out = parsed.to_numpy()[np.where(codes >= 0, codes, 0)]
+    out = pd.Series(out, index=values.index)
+    out[codes < 0] = pd.NaT
+    return out
+
+
+def parse_datahora(data: pd.Series, hora: pd.Series | None = None) -> pd.Series:
+    if hora is None:
+        return _broadcast(
+            data, lambda u: _parse_unique_datetimes(u, DATETIME_FORMATS + DATE_FORMATS)
+        )
+
+    dias = _broadcast(data, lambda u: _parse_unique_datetimes(u, DATE_FORMATS))
+    horas = _broadcast(hora, _parse_unique_times)
+    return dias.dt.normalize() + horas
+
+
+def _categorical(values: np.ndarray, to_category, index) -> pd.Series:
+    codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=True)
+    categories = [to_category(u) for u in uniques]
+    return pd.Series(
+        pd.Categorical.from_codes(codes, categories=pd.Index(categories, dtype=object)),
+        index=index,
+    )
+
+
+def _format_hora(td) -> str:
+    segundos = int(pd.Timedelta(td).total_seconds())
+    return f"{segundos // 3600:02d}:{segundos // 60 % 60:02d}:{segundos % 60:02d}"
+
+
+def split_datahora(datahora: pd.Series) -> dict[str, pd.Series]:
+    # dias e horários se repetem muito mais que os instantes completos, então
+    # cada parte é fatorada separadamente e convertida apenas nos valores únicos
+    values = datahora.to_numpy(dtype="datetime64[ns]")
+    dias = values.astype("datetime64[D]")
+    horas = values - dias.astype("datetime64[ns]")
+
+    return {
+        "Data": _categorical(dias, lambda d: pd.Timestamp(d).date(), datahora.index),
+        "Hora": _categorical(horas, lambda td: (pd.Timestamp(0) + pd.Timedelta(td)).time(), datahora.index),
+        "HoraStr": _categorical(horas, _format_hora, datahora.index),
+    }
@@ -1,19 +1,43 @@
 import streamlit as st
 
+from data_loader import day_slice
+from reference_series import list_reference_files
+from settings import LIVE_MAP_REFRESH_SECONDS
+
 
 VARIABLE_MAP = {
     "Temperatura (°C)": "Temperatura (°C)",
     "Umidade Relativa (%)": "RH (%)",
     "CO2 (ppm)": "CO2 (ppm)",
     "Ponto de Orvalho (°C)": "Ponto de Orvalho (°C)",
+    "Índice de Calor (°C)": "Índice de Calor (°C)",
+    "Umidade Absoluta (g/m³)": "Umidade Absoluta (g/m³)",
+    "Humidex": "Humidex",
+    "Ponto de Orvalho Calculado (°C)": "Ponto de Orvalho Calculado (°C)",
+    "Desvio do Ponto de Orvalho (medido − calculado, °C)": "Desvio Ponto de Orvalho (°C)",
 }
 
 
+MODE_DAY = "Dia selecionado"
+MODE_COMPARE = "Comparação entre dias"
+
+
 def render_sidebar(df):
     st.sidebar.title("Filtros")
 
+    modo = st.sidebar.radio(
+        "Modo de visualização",
+        options=[MODE_DAY, MODE_COMPARE],
+        index=0,
+    )
+
     datas_disponiveis = sorted(df["Data"].dropna().unique())
-    data_sel = st.sidebar.selectbox("Selecione o dia:", datas_disponiveis)
+    # o dia mais recente abre por padrão; é o mesmo que o aquecimento deixa pronto
+    data_sel = st.sidebar.selectbox(
+        "Selecione o dia:",
+        datas_disponiveis,
+        index=max(len(datas_disponiveis) - 1, 0),
+    )
 
     pontos_disponiveis = sorted(df["pontos"].dropna().unique().tolist())
     pontos_sel = st.sidebar.multiselect(
@@ -22,9 +46,7 @@ def render_sidebar(df):
         default=pontos_disponiveis,
     )
 
-    horarios_filtrados = (
-        df[df["Data"] == data_sel]["HoraStr"].dropna().unique().tolist()
-    )
+    horarios_filtrados = day_slice(df, data_sel)["HoraStr"].dropna().unique().tolist()
     hora_sel = st.sidebar.selectbox(
         "Horário(s):",
         ["Todos"] + sorted(horarios_filtrados),
@@ -36,6 +58,21 @@ def render_sidebar(df):
         list(VARIABLE_MAP.keys()),
     )
 
+    mostrar_superficie = st.sidebar.checkbox(
+        "Mostrar superfície interpolada (IDW) no mapa",
+        value=False,
+    )
+
+    mapa_ao_vivo = st.sidebar.checkbox(
+        f"Mapa ao vivo (atualiza a cada {LIVE_MAP_REFRESH_SECONDS:.0f} s)",
+        value=False,
+    )
+
+    excluir_falhas = st.sidebar.checkbox(
+        "Desconsiderar leituras com falha de sensor nas médias",
+        value=True,
+    )
+
     st.sidebar.markdown("---")
     st.sidebar.subheader("Comparativo de Referências")
     ref_tipo = st.sidebar.radio(
@@ -44,6 +81,13 @@ def render_sidebar(df):
         index=2,
     )
 
+    series = {p.name: p for p in list_reference_files()}
+    ref_nome = st.sidebar.selectbox(
+        "Série externa (INMET):",
+        ["Valores fixos"] + list(series),
+    )
+    ref_serie = series.get(ref_nome)
+
     ext_temp = st.sidebar.number_input(
         "Temperatura externa de referência (°C)",
         value=22.0,
@@ -66,15 +110,20 @@ def render_sidebar(df):
     render_sidebar_tables()
 
     return {
+        "modo": modo,
         "data_sel": data_sel,
         "pontos_sel": pontos_sel,
         "hora_sel": hora_sel,
         "variavel": variavel,
         "col_sel": VARIABLE_MAP[variavel],
+        "excluir_falhas": excluir_falhas,
+        "mostrar_superficie": mostrar_superficie,
+        "mapa_ao_vivo": mapa_ao_vivo,
         "ref_tipo": ref_tipo,
         "ext_temp": ext_temp,
         "ext_ur": ext_ur,
         "ext_co2": ext_co2,
+        "ref_serie": ref_serie,
     }
 
 
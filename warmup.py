@@ -0,0 +1,221 @@
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from settings import DATA_SOURCE, PDF_CHART_BACKEND, PDF_DEFAULT_PROFILE, WARMUP_RUNTIME_TIMEOUT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pendente"
+RUNNING = "aquecendo"
+READY = "pronto"
+FAILED = "falhou"
+
+_state = {
+    "status": PENDING,
+    "versao": None,
+    "data": None,
+    "inicio": None,
+    "fim": None,
+    "segundos": None,
+    "etapas": {},
+    "erro": None,
+}
+_lock = threading.Lock()
+_thread = None
+
+
+def readiness() -> dict:
+    with _lock:
+        return {**_state, "etapas": dict(_state["etapas"])}
+
+
+def is_ready() -> bool:
+    with _lock:
+        return _state["status"] == READY
+
+
+def _stage(nome, fn, obrigatoria=False):
+    inicio = time.perf_counter()
+    try:
+        resultado = fn()
+    except Exception as e:
+        segundos = round(time.perf_counter() - inicio, 3)
+        with _lock:
+            _state["etapas"][nome] = {"segundos": segundos, "erro": str(e)}
+        logger.warning("Aquecimento: %s falhou em %.2f s: %s", nome, segundos, e)
+        if obrigatoria:
+            raise
+        return None
+
+    segundos = round(time.perf_counter() - inicio, 3)
+    with _lock:
+        _state["etapas"][nome] = {"segundos": segundos}
+    logger.info("Aquecimento: %s em %.2f s", nome, segundos)
+    return resultado
+
+
+def _warm_chart_renderer(df_dia, pontos):
+    if PDF_CHART_BACKEND == "kaleido":
+        import plotly.graph_objects as go
+
+        from report import _configure_kaleido, _kaleido_lock
+
+        # a primeira exportação sobe o subprocesso do kaleido, que fica vivo
+        with _kaleido_lock:
+            _configure_kaleido()
+            go.Figure(go.Bar(x=pontos, y=[0] * len(pontos))).to_image(format="png", width=200, height=100)
+    else:
+        from report import build_vector_charts
+
+        build_vector_charts(df_dia, "Ambos", 22.0, 60.0, 400.0, 450, 240)
+
+
+def _warm_interactive_map(df_dia, pontos, col_sel, variavel):
+    from map_view import build_map
+
+    build_map(df_dia, col_sel, variavel, pontos)._repr_html_()
+
+
+def _warm_basemap(df_dia, pontos, col_sel, variavel):
+    from map_export import export_static_map
+
+    # preenche o cache de mosaicos e do mapa-base usado no PDF
+    temp_dir, _ = export_static_map(df_dia, pontos, col_sel, variavel, profile=PDF_DEFAULT_PROFILE)
+    temp_dir.cleanup()
+
+
+def warm_up(source=DATA_SOURCE, extra_stages=()) -> dict:
+    from anomalies import valid_readings
+    from cube import build_cube
+    from data_loader import build_statistics, dataset_version, filter_data, load_data
+    from interpolation import build_surface
+    from ui import VARIABLE_MAP
+
+    with _lock:
+        _state.update(status=RUNNING, inicio=datetime.now().isoformat(timespec="seconds"), fim=None, erro=None)
+        _state["etapas"] = {}
+    inicio = time.perf_counter()
+
+    try:
+        df = _stage("carregar base", lambda: load_data(source), obrigatoria=True)
+        versao = dataset_version(source)
+        datas = sorted(df["Data"].dropna().unique())
+        if not datas:
+            raise ValueError("Nenhuma data disponível na base.")
+        data_sel = datas[-1]
+        pontos = sorted(df["pontos"].dropna().unique().tolist())
+        variavel, col_sel = next(iter(VARIABLE_MAP.items()))
+
+        def indices():
+            df_dia = filter_data(df, data_sel, pontos, "Todos")
+            df_dia["HoraStr"].dropna().unique()
+            return df_dia
+
+        df_dia = _stage("índices do último dia", indices, obrigatoria=True)
+        df_agregado = valid_readings(df_dia)
+
+        def agregados():
+            colunas = tuple(VARIABLE_MAP.values())
+            chave = (versao, data_sel, tuple(pontos), "Todos", True)
+            build_statistics(df_agregado, col_sel, chave=chave, colunas=colunas)
+            build_surface(df_agregado, col_sel, pontos, data_sel, "Todos")
+            build_cube(df, versao, colunas, True)
+
+        _stage("agregados do último dia", agregados)
+        _stage("renderizador de gráficos", lambda: _warm_chart_renderer(df_agregado, pontos))
+        _stage("mapa interativo", lambda: _warm_interactive_map(df_agregado, pontos, col_sel, variavel))
+        _stage("mapa-base do PDF", lambda: _warm_basemap(df_agregado, pontos, col_sel, variavel))
+        for nome, fn in extra_stages:
+            _stage(nome, fn)
+    except Exception as e:
+        segundos = round(time.perf_counter() - inicio, 3)
+        with _lock:
+            _state.update(status=FAILED, erro=str(e), segundos=segundos, fim=datetime.now().isoformat(timespec="seconds"))
+        logger.error("Aquecimento falhou após %.2f s: %s", segundos, e)
+        return readiness()
+
+    segundos = round(time.perf_counter() - inicio, 3)
+    with _lock:
+        _state.update(
+            status=READY,
+            versao=versao,
+            data=str(data_sel),
+            segundos=segundos,
+            fim=datetime.now().isoformat(timespec="seconds"),
+        )
+    logger.info("Aquecimento concluído em %.2f s (base %s, dia %s)", segundos, versao, data_sel)
+    return readiness()
+
+
+def _wait_for_runtime(timeout=WARMUP_RUNTIME_TIMEOUT_SECONDS) -> bool:
+    # fora do runtime do Streamlit, st.cache_data grava num cache descartável;
+    # quem sobe o servidor (serve.py) só aquece depois que o runtime existe
+    from streamlit import runtime
+
+    limite = time.monotonic() + timeout
+    while not runtime.exists():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+def _run(source, extra_stages, aguardar_runtime):
+    if aguardar_runtime and not _wait_for_runtime():
+        logger.warning("Aquecimento: runtime do Streamlit não apareceu; aquecendo assim mesmo")
+    warm_up(source, extra_stages)
+
+
+def start_warm_up(source=DATA_SOURCE, extra_stages=(), aguardar_runtime=False) -> threading.Thread:
+    # uma única execução em segundo plano por processo
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(
+                target=_run,
+                args=(source, tuple(extra_stages), aguardar_runtime),
+                name="aquecimento",
+                daemon=True,
+            )
+            _thread.start()
+        return _thread
+
+
+class _ReadinessHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        # 503 até o aquecimento terminar, para o balanceador só enviar tráfego depois
+        estado = readiness()
+        body = json.dumps(estado, ensure_ascii=False).encode("utf-8")
+        self.send_response(200 if estado["status"] == READY else 503)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_readiness(host: str, port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), _ReadinessHandler)
+    threading.Thread(target=server.serve_forever, name="prontidao", daemon=True).start()
+    return server
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    estado = warm_up()
+    for nome, etapa in estado["etapas"].items():
+        extra = f" ({etapa['erro']})" if "erro" in etapa else ""
+        print(f"{nome}: {etapa['segundos']:.2f} s{extra}")
+    print(f"{estado['status']} em {estado['segundos']:.2f} s")
+    raise SystemExit(0 if estado["status"] == READY else 1)
+
+
+if __name__ == "__main__":
+    main()